@@ -1,15 +1,50 @@
+import asyncio
 import subprocess
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from routers import video_router
+from routers.video import job_store, output_delivery
+from services import WorkerPool
+from services.hls_preview import HLS_PREVIEW_TTL
+from services.job_store import FINISHED_STATUSES
+from services.metrics import CONTENT_TYPE, render_metrics, reset_metrics
+from services.voice_catalog import voice_catalog
+from services.workspace import run_workspace_sweeper
 from pathlib import Path
 import os
 
 API_PREFIX = "/api/v1"
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
 
-app = FastAPI(title="Video API")
+def is_job_active(job_id: str) -> bool:
+    job = job_store.get_job(job_id)
+    return job is not None and job["status"] not in FINISHED_STATUSES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pipeline stages run in worker processes (each warms its own models)
+    reset_metrics()
+    worker_pool = WorkerPool(db_path=job_store.db_path)
+    worker_pool.start()
+    supervisor = asyncio.create_task(worker_pool.supervise())
+    sweeper = asyncio.create_task(run_workspace_sweeper(is_active=is_job_active))
+    # Job previews live next to the outputs, one directory per job
+    preview_sweeper = asyncio.create_task(run_workspace_sweeper(
+        is_active=is_job_active, root=str(output_delivery.output_dir / "previews"), max_age=HLS_PREVIEW_TTL,
+    ))
+    voice_refresher = asyncio.create_task(voice_catalog.run_refresher())
+    yield
+    supervisor.cancel()
+    sweeper.cancel()
+    preview_sweeper.cancel()
+    voice_refresher.cancel()
+    await asyncio.to_thread(worker_pool.stop)
+
+
+app = FastAPI(title="Video API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -36,6 +71,11 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+@app.get(f"{API_PREFIX}/metrics")
+async def metrics():
+    """Prometheus metrics aggregated over the API and worker processes"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 def main():
     subprocess.run([
         "uvicorn", "main:app",
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, File, status, UploadFile
-from fastapi.responses import FileResponse
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, File, Header, Request, status, UploadFile
+from fastapi.responses import Response
 from fastapi.responses import StreamingResponse
 from pathlib import Path
-import shutil
 import json
-from services import VideoService, TranslationService, TranscriptionService, TTSService
-import edge_tts
+from typing import AsyncIterator, Optional
+from services import JobStore, Workspace
+from services.output_delivery import OutputDelivery
+from services.result_cache import ResultCache
+from services.voice_catalog import voice_catalog
+from services.ingest import IngestRejected, StreamingIngest, iter_upload
+from services.job_store import QUEUED, COMPLETED, FAILED, FINISHED_STATUSES
 from fastapi.responses import JSONResponse
 from itertools import islice
 
@@ -13,199 +19,302 @@ from sympy.codegen.ast import Raise
 
 router = APIRouter(prefix="/video", tags=["Video"])
 
-translation_service = TranslationService()
-video_service = VideoService()
-transcription_service = TranscriptionService()
-tts_service = TTSService()
+# Longer videos are transcribed in windows, so the cap only bounds total work per job
+MAX_VIDEO_DURATION = float(os.getenv("MAX_VIDEO_DURATION", "3600"))
+# Languages one multi-language job may dub into
+MAX_TARGET_LANGUAGES = int(os.getenv("MAX_TARGET_LANGUAGES", "5"))
+JOB_EVENTS_POLL_INTERVAL = 0.5
 
-def send_sse_event(event_type: str, data: dict):
-    """Helper to format SSE events"""
-    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
-
-async def process_video_with_progress(file: UploadFile, target_language: str, voice: str):
-    print(f"Processing {target_language} {voice}")
-    """Process video and yield SSE progress events"""
-    upload_dir = Path("./uploads")
-    temp_dir = Path("./temp")
-    output_dir = Path("./outputs")
-
-    for d in [upload_dir, temp_dir, output_dir]:
-        d.mkdir(exist_ok=True)
-
-    video_path = upload_dir / file.filename
-    with open(video_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+job_store = JobStore()
+ingest_service = StreamingIngest()
+result_cache = ResultCache()
+output_delivery = OutputDelivery()
 
+def send_sse_event(event_type: str, data: dict, event_id: Optional[int] = None):
+    """Helper to format SSE events"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+async def enqueue_job(
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        target_language: str,
+        voice: Optional[str],
+        max_duration: Optional[float],
+        targets: Optional[list] = None,
+) -> str:
+    """Ingest an upload into a fresh job workspace and queue the job (for several languages with `targets`)"""
+    job_id = job_store.new_job_id()
+    workspace = Workspace(job_id)
+    # Never trust the client filename as a path, and keep it out of shared directories
+    filename = Path(filename or "video.mp4").name
     try:
-        duration = video_service.get_video_duration(str(video_path))
-
-        if duration > 60:
-            raise Exception("Video duration is longer than 1 minute")
-
-        # Progress: Upload complete
-        yield send_sse_event("progress", {"stage": "upload", "message": "Video uploaded successfully", "progress": 10})
-
-        # 1. Extract clean WAV audio (16kHz is best for Whisper)
-        yield send_sse_event("progress", {"stage": "extract_audio", "message": "Extracting audio from video...", "progress": 20})
-        audio_path = temp_dir / "original_audio.wav"
-        video_service.extract_audio_from_video(str(video_path), str(audio_path))
-        yield send_sse_event("progress", {"stage": "extract_audio", "message": "Audio extracted successfully", "progress": 30})
-
-        # 2. Transcribe with WhisperX (gives perfect word-level timestamps)
-        yield send_sse_event("progress", {"stage": "transcribe", "message": "Transcribing audio...", "progress": 40})
-        transcription = transcription_service.transcribe_audio(str(audio_path))
-        yield send_sse_event("progress", {"stage": "transcribe", "message": f"Transcription complete. Found {len(transcription['text'])} segments.", "progress": 50})
-
-        # 3. Translate each segment individually
-        yield send_sse_event("progress", {"stage": "translate", "message": "Translating segments...", "progress": 55})
-        translated_segments = []
-
-        if transcription.get("language") != target_language:
-            total_segments = len(transcription["text"])
-            for idx, seg in enumerate(transcription["text"]):
-                translated = await translation_service.translate_text(seg["text"], target_lang=target_language)
-                translated_segments.append({
-                    "start": seg["start"],
-                    "end": seg["end"],
-                    "duration": seg["end"] - seg["start"],
-                    "translated_text": translated
-                })
-                # Update progress for translation
-                translation_progress = 55 + int((idx + 1) / total_segments * 20)
-                yield send_sse_event("progress", {
-                    "stage": "translate",
-                    "message": f"Translated {idx + 1}/{total_segments} segments",
-                    "progress": translation_progress
-                })
-        else:
-            raise Exception("Same language")
-
-        # 4. Generate + speed-adjust TTS segment by segment
-        yield send_sse_event("progress", {"stage": "tts", "message": "Generating speech...", "progress": 75})
-        final_audio_path = temp_dir / "final_dubbed_audio.wav"
-        await tts_service.generate_perfectly_synced_audio(
-            segments=translated_segments,
-            output_path=str(final_audio_path),
-            voice=str(voice),
+        ingested = await ingest_service.ingest(
+            chunks,
+            video_path=str(workspace.file(f"upload{Path(filename).suffix}")),
+            audio_path=str(workspace.file("original_audio.wav")),
+            max_duration=max_duration,
         )
-        yield send_sse_event("progress", {"stage": "tts", "message": "Speech generation complete", "progress": 85})
-
-        # 5. Replace audio with perfect length match
-        yield send_sse_event("progress", {"stage": "merge", "message": "Merging audio with video...", "progress": 90})
-        output_video_path = output_dir / f"dubbed_{file.filename}"
-        video_service.replace_audio_perfect_sync(
-            video_path=str(video_path),
-            audio_path=str(final_audio_path),
-            output_path=str(output_video_path)
-        )
-        yield send_sse_event("progress", {"stage": "merge", "message": "Video processing complete", "progress": 95})
-
-        # Final success event
-        yield send_sse_event("complete", {
-            "status": "success",
-            "translated_video": str(output_video_path).replace("outputs", ""),
-            "original_language": transcription.get("language", "unknown"),
+        params = {
+            "job_id": job_id,
+            "video_path": ingested["video_path"],
+            "audio_path": ingested["audio_path"],
+            "duration": ingested["duration"],
+            "content_hash": ingested["content_hash"],
+            "filename": filename,
             "target_language": target_language,
-            "progress": 100
-        })
-
-    except Exception as e:
-        yield send_sse_event("error", {"message": str(e), "progress": 0})
-    finally:
-        # Optional: clean temp files
-        pass
+            "voice": voice,
+            "max_duration": max_duration,
+        }
+        if targets is not None:
+            # The pipeline answers already dubbed languages from the cache itself
+            del params["target_language"], params["voice"]
+            params["targets"] = targets
+            return await asyncio.to_thread(job_store.create_job, params, job_id)
+
+        # Re-submission of an already dubbed file: answer from the cache without queueing
+        cached = await asyncio.to_thread(result_cache.get_result, ingested["content_hash"], target_language, voice)
+        if cached is not None:
+            workspace.cleanup()
+            return await asyncio.to_thread(job_store.create_finished_job, params, {**cached, "cached": True}, job_id)
+
+        return await asyncio.to_thread(job_store.create_job, params, job_id)
+    except BaseException:
+        workspace.cleanup()
+        raise
+
+async def stream_job_events(job_id: str, after_seq: int = 0):
+    """Yield SSE events of a job until it finishes, starting after `after_seq`"""
+    while True:
+        # Read the status first: once a job is finished all of its events are already stored
+        job = await asyncio.to_thread(job_store.get_job, job_id)
+        events = await asyncio.to_thread(job_store.get_events, job_id, after_seq)
+        for event in events:
+            after_seq = event["seq"]
+            yield send_sse_event(event["event"], event["data"], event_id=event["seq"])
+
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return
+        if not events:
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+async def single_event(event_type: str, data: dict):
+    yield send_sse_event(event_type, data)
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
 
 @router.post("/upload", status_code=status.HTTP_200_OK)
 async def upload_video(file: UploadFile = File(...), target_language: str = "ru"):
     """Original endpoint for backward compatibility"""
-    upload_dir = Path("./uploads")
-    temp_dir = Path("./temp")
-    output_dir = Path("./outputs")
+    job_id = await enqueue_job(iter_upload(file), file.filename, target_language, voice=None, max_duration=None)
+
+    # Wait for a worker to finish the job without blocking the event loop
+    while True:
+        job = await asyncio.to_thread(job_store.get_job, job_id)
+        if job["status"] in FINISHED_STATUSES:
+            break
+        await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+
+    result = job["result"]
+    return {
+        "status": "success",
+        "translated_video": f"outputs{result['translated_video']}",
+        "original_language": result.get("original_language", "unknown"),
+        "target_language": target_language,
+    }
 
-    for d in [upload_dir, temp_dir, output_dir]:
-        d.mkdir(exist_ok=True)
+@router.post("/upload-stream")
+async def upload_video_stream(file: UploadFile = File(...), target_language: str = "ru", voice: str = "en-US-AdamMultilingualNeural"):
+    """Upload video with SSE progress streaming"""
+    print("target language: ", target_language, voice)
+    try:
+        job_id = await enqueue_job(iter_upload(file), file.filename, target_language, voice, max_duration=MAX_VIDEO_DURATION)
+    except IngestRejected as e:
+        return sse_response(single_event("error", {"message": str(e), "progress": 0}))
+    return sse_response(stream_job_events(job_id))
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(file: UploadFile = File(...), target_language: str = "ru", voice: Optional[str] = None):
+    """Queue a dubbing job and return its id right away"""
+    try:
+        job_id = await enqueue_job(iter_upload(file), file.filename, target_language, voice, max_duration=MAX_VIDEO_DURATION)
+    except IngestRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": QUEUED}
 
-    video_path = upload_dir / file.filename
-    with open(video_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+@router.post("/jobs/stream", status_code=status.HTTP_202_ACCEPTED)
+async def create_job_from_stream(request: Request, filename: str, target_language: str = "ru", voice: Optional[str] = None):
+    """
+    Queue a dubbing job from a raw (non-multipart) request body
 
+    The body is hashed, written and fed to audio extraction while it is
+    still arriving, so long uploads are rejected as soon as the container
+    header shows they are too long.
+    """
     try:
-        # 1. Extract clean WAV audio (16kHz is best for Whisper)
-        audio_path = temp_dir / "original_audio.wav"
-        video_service.extract_audio_from_video(str(video_path), str(audio_path))
-
-        # 2. Transcribe with WhisperX (gives perfect word-level timestamps)
-        transcription = transcription_service.transcribe_audio(str(audio_path))
-        # transcription now has: segments = [{"id":.., "start": 1.23, "end": 4.56, "text": "..."}, ...]
-        print(transcription)
-        # 3. Translate each segment individually
-        translated_segments = []
-        for seg in transcription["text"]:
-            translated = await translation_service.translate_text(seg["text"], target_lang=target_language)
-            translated_segments.append({
-                "start": seg["start"],
-                "end": seg["end"],
-                "duration": seg["end"] - seg["start"],
-                "translated_text": translated
-            })
+        job_id = await enqueue_job(request.stream(), filename, target_language, voice, max_duration=MAX_VIDEO_DURATION)
+    except IngestRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": QUEUED}
 
-        # 4. Generate + speed-adjust TTS segment by segment
-        final_audio_path = temp_dir / "final_dubbed_audio.wav"
-        await tts_service.generate_perfectly_synced_audio(
-            segments=translated_segments,
-            output_path=str(final_audio_path),
-            voice=tts_service.get_voice_for_language(target_language),  # e.g. "ru-RU-SvetlanaNeural"
-        )
+def parse_targets(target_languages: str, voices: Optional[str]) -> list:
+    """
+    Targets of a multi-language job from comma-separated languages and voices
 
-        # 5. Replace audio with perfect length match
-        output_video_path = output_dir / f"dubbed_{file.filename}"
-        video_service.replace_audio_perfect_sync(
-            video_path=str(video_path),
-            audio_path=str(final_audio_path),
-            output_path=str(output_video_path)
-        )
+    Voices are matched to languages by position; a missing or empty voice
+    means the default voice of that language.
+    """
+    languages = [language.strip() for language in target_languages.split(",") if language.strip()]
+    voice_list = [voice.strip() or None for voice in voices.split(",")] if voices else []
+    if not languages:
+        raise HTTPException(status_code=400, detail="No target languages given")
+    if not all(language.replace("-", "").isalnum() for language in languages):
+        raise HTTPException(status_code=400, detail="Invalid target language")
+    if len(set(languages)) != len(languages):
+        raise HTTPException(status_code=400, detail="Target languages must be unique")
+    if len(languages) > MAX_TARGET_LANGUAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TARGET_LANGUAGES} target languages per job")
+    if len(voice_list) > len(languages):
+        raise HTTPException(status_code=400, detail="More voices than target languages")
+    voice_list += [None] * (len(languages) - len(voice_list))
+    return [{"language": language, "voice": voice} for language, voice in zip(languages, voice_list)]
+
+@router.post("/jobs/multi", status_code=status.HTTP_202_ACCEPTED)
+async def create_multi_language_job(file: UploadFile = File(...), target_languages: str = "ru,es,de", voices: Optional[str] = None):
+    """
+    Queue one job dubbing the video into several languages (comma-separated)
 
-        return {
-            "status": "success",
-            "translated_video": str(output_video_path),
-            "original_language": transcription.get("language", "unknown"),
-            "target_language": target_language,
-        }
+    Audio is extracted and transcribed once; translation, speech and muxing
+    run per language in parallel. Progress of all languages is streamed on
+    /jobs/{job_id}/events, each event tagged with its "language".
+    """
+    targets = parse_targets(target_languages, voices)
+    try:
+        job_id = await enqueue_job(iter_upload(file), file.filename, targets[0]["language"], None,
+                                   max_duration=MAX_VIDEO_DURATION, targets=targets)
+    except IngestRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": QUEUED, "target_languages": [target["language"] for target in targets]}
+
+@router.post("/upload-stream/multi")
+async def upload_video_stream_multi(file: UploadFile = File(...), target_languages: str = "ru,es,de", voices: Optional[str] = None):
+    """Upload a video for several target languages with SSE progress of all of them on one stream"""
+    targets = parse_targets(target_languages, voices)
+    try:
+        job_id = await enqueue_job(iter_upload(file), file.filename, targets[0]["language"], None,
+                                   max_duration=MAX_VIDEO_DURATION, targets=targets)
+    except IngestRejected as e:
+        return sse_response(single_event("error", {"message": str(e), "progress": 0}))
+    return sse_response(stream_job_events(job_id))
+
+async def get_job_or_404(job_id: str) -> dict:
+    job = await asyncio.to_thread(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = await get_job_or_404(job_id)
+    last_event = await asyncio.to_thread(job_store.last_event, job_id)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": last_event["data"].get("progress", 0) if last_event else 0,
+        "stage": last_event["data"].get("stage") if last_event else None,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await get_job_or_404(job_id)
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+@router.post("/jobs/{job_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_job(job_id: str):
+    """Requeue a failed job; it resumes after its last completed stage"""
+    await get_job_or_404(job_id)
+    if not Workspace.exists(job_id):
+        raise HTTPException(status_code=410, detail="Job workspace has expired, upload the video again")
+    retry_seq = await asyncio.to_thread(job_store.retry_job, job_id)
+    if retry_seq is None:
+        raise HTTPException(status_code=409, detail="Only failed jobs can be retried")
+    # Events of the new run start with the retry marker
+    return {"job_id": job_id, "status": QUEUED, "events_after": retry_seq - 1}
+
+@router.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, after: int = 0, last_event_id: Optional[str] = Header(None)):
+    """Reattach to the SSE progress stream of an existing job (its latest run, if it was retried)"""
+    await get_job_or_404(job_id)
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    # Don't replay the failed run (and its error event) of a retried job
+    after = max(after, await asyncio.to_thread(job_store.current_run_start, job_id))
+    return sse_response(stream_job_events(job_id, after))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Optional: clean temp files
-        pass
+@router.get("/download/{file_path}")
+async def download_dubbed_video(request: Request, file_path: str, inline: bool = False):
+    """
+    Download (or with ?inline=true, play) a dubbed video
 
-@router.post("/upload-stream")
-async def upload_video_stream(file: UploadFile = File(...), target_language: str = "ru", voice: str = "en-US-AdamMultilingualNeural"):
-    """Upload video with SSE progress streaming"""
-    print("target language: ", target_language, voice)
-    return StreamingResponse(
-        process_video_with_progress(file, target_language, voice),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
-        }
-    )
+    Supports Range requests and If-None-Match; behind nginx the transfer is
+    handed off with X-Accel-Redirect.
+    """
+    final_video_path = output_delivery.resolve(file_path)
 
-@router.get("/download/{file_path}")
-async def download_dubbed_video(file_path: str):
-    """Direct download with proper filename"""
-    final_audio_path = Path(f"./outputs/{file_path}")
+    if final_video_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return output_delivery.response(request, final_video_path, inline=inline)
+
+
+@router.get("/preview/{job_id}/{file_name}")
+async def preview_dubbed_video(request: Request, job_id: str, file_name: str):
+    """HLS preview of a job's dub (index.m3u8 and its segments), available while it is rendered"""
+    return await preview_response(request, job_id, None, file_name)
+
+@router.get("/preview/{job_id}/{language}/{file_name}")
+async def preview_dubbed_video_language(request: Request, job_id: str, language: str, file_name: str):
+    """HLS preview of one language of a multi-language job"""
+    return await preview_response(request, job_id, language, file_name)
 
-    if not Path(final_audio_path).exists():
+async def preview_response(request: Request, job_id: str, language: Optional[str], file_name: str):
+    await get_job_or_404(job_id)
+
+    # Segments are written once; nginx's internal location only covers the final outputs
+    preview_dir = output_delivery.output_dir / "previews" / job_id
+    if language is not None:
+        if not language.replace("-", "").isalnum():
+            raise HTTPException(status_code=404, detail="File not found")
+        preview_dir = preview_dir / language
+    preview_delivery = OutputDelivery(output_dir=str(preview_dir), accel_prefix="")
+    preview_path = preview_delivery.resolve(file_name)
+    if preview_path is None:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
-        path=final_audio_path,
-        media_type="video/mp4",
-        filename=Path(final_audio_path).name,
-        headers={"Content-Disposition": f"attachment; filename={Path(final_audio_path).name}"}
-    )
+    response = preview_delivery.response(request, preview_path, inline=True)
+    if preview_path.suffix == ".m3u8":
+        # The playlist grows until the job finishes: players must revalidate it
+        response.headers["Cache-Control"] = "no-cache"
+    return response
 
 # Your target languages
 TARGET_LANGUAGES = {
@@ -217,22 +326,29 @@ TARGET_LANGUAGES = {
     "hy": "hy-AM"
 }
 
+# How long browsers may reuse a voice list without revalidating it
+VOICES_MAX_AGE = int(os.getenv("VOICES_MAX_AGE", "3600"))
+
+
+def catalog_response(request: Request, content) -> Response:
+    """JSON response tagged with the catalog version; 304 if the client already has it"""
+    etag = f'"{voice_catalog.etag}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={VOICES_MAX_AGE}"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+
 @router.get("/voices")
-async def get_voices():
+async def get_voices(request: Request):
     """
     Get available voices for specific languages
     """
-    # Get all available voices from edge-tts
-    all_voices = await edge_tts.list_voices()
-
     # Filter and organize voices by target languages
     result = []
 
     for lang_code, locale_prefix in TARGET_LANGUAGES.items():
-        matching_voices = [
-            v for v in all_voices
-            if v['Locale'].startswith(locale_prefix)
-        ]
+        matching_voices = await voice_catalog.find(locale=locale_prefix)
 
         if matching_voices:
             voices_list = [
@@ -248,14 +364,14 @@ async def get_voices():
                 "voices": voices_list
             })
 
-    return JSONResponse(content=result)
+    return catalog_response(request, result)
 
 
 @router.get("/voices/{language}")
-async def get_voices_by_language(language: str):
+async def get_voices_by_language(request: Request, language: str, gender: Optional[str] = None):
     """
     Get available voices for a specific language
-    Example: /voices/en or /voices/hy
+    Example: /voices/en or /voices/hy?gender=male
     """
     if language not in TARGET_LANGUAGES:
         return JSONResponse(
@@ -263,19 +379,15 @@ async def get_voices_by_language(language: str):
             status_code=400
         )
 
-    locale_prefix = TARGET_LANGUAGES[language]
-    all_voices = await edge_tts.list_voices()
-
     matching_voices = [
         {
             "gender": voice['Gender'],
             "voice": voice['ShortName']
         }
-        for voice in all_voices
-        if voice['Locale'].startswith(locale_prefix)
+        for voice in await voice_catalog.find(locale=TARGET_LANGUAGES[language], gender=gender)
     ]
 
-    return JSONResponse(content={
+    return catalog_response(request, {
         "locale": language,
         "voices": matching_voices
-    })
\ No newline at end of file
+    })
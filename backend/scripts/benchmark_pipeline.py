@@ -0,0 +1,329 @@
+"""
+Benchmark the dubbing pipeline end to end without external services
+
+Synthetic videos are generated with ffmpeg, translation goes through the
+real MyMemory client against a local HTTP stub, and TTS uses the offline
+tone synthesizer (TTS_BACKEND=tone). Each job runs the same path as an
+upload: streaming ingest, then DubbingPipeline.run. Reports per-stage wall
+and CPU time, peak RSS and jobs/minute.
+
+`--concurrency` is the number of jobs sharing one event loop, i.e.
+JOBS_PER_WORKER of a single worker process; multiply the jobs/minute by
+JOB_WORKERS to size a node. Per-stage CPU time is process-wide, so it is
+only attributable to a stage with --concurrency 1.
+
+Tone-only videos give WhisperX little to recognize: use --speech with a
+real recording, or --asr fake for evenly spaced synthetic segments.
+
+Usage:
+    python scripts/benchmark_pipeline.py --jobs 8 --concurrency 4 --duration 30 --asr fake
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+STAGE_ORDER = ["ingest", "upload", "extract_audio", "transcribe", "translate", "tts", "merge"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the dubbing pipeline with local stand-ins")
+    parser.add_argument("--jobs", type=int, default=4, help="number of jobs to run")
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs running at the same time")
+    parser.add_argument("--duration", type=float, default=30, help="length of each synthetic video in seconds")
+    parser.add_argument("--target-language", default="es")
+    parser.add_argument("--asr", choices=["whisper", "fake"], default="whisper",
+                        help="real WhisperX, or synthetic segments without a model")
+    parser.add_argument("--segment-length", type=float, default=3.0, help="segment length of --asr fake")
+    parser.add_argument("--speech", help="audio file looped as the soundtrack instead of tone bursts")
+    parser.add_argument("--render-mode", choices=["graph", "timeline"], default=os.getenv("DUB_RENDER_MODE", "graph"))
+    parser.add_argument("--translation-latency", type=float, default=0.05,
+                        help="seconds the translation stub waits per request")
+    parser.add_argument("--translation-rate", type=float, default=1000, help="translation requests per second")
+    parser.add_argument("--work-dir", help="where to keep videos and outputs (default: a temp dir)")
+    return parser.parse_args()
+
+
+class TranslationStub:
+    """Local HTTP server answering like the MyMemory GET API"""
+
+    def __init__(self, latency: float):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                text = query.get("q", [""])[0]
+                target = query.get("langpair", ["en|es"])[0].split("|")[-1]
+                time.sleep(latency)
+                body = json.dumps({
+                    "responseStatus": 200,
+                    "matches": [{"translation": f"[{target}] {text}"}],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/get"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class FakeTranscriptionService:
+    """Evenly spaced English segments over the audio, without loading a model"""
+
+    def __init__(self, segment_length: float):
+        self.segment_length = segment_length
+
+    def _segments(self, start: float, end: float) -> list:
+        segments = []
+        position = start
+        while position < end - 0.5:
+            segment_end = min(position + self.segment_length, end)
+            segments.append({
+                "start": position,
+                "end": segment_end,
+                "text": f"This is synthetic segment number {len(segments) + 1} of the benchmark.",
+            })
+            position = segment_end
+        return segments
+
+    @staticmethod
+    def _duration(audio_path: str) -> float:
+        with wave.open(audio_path, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+
+    def _result(self, segments: list) -> dict:
+        return {"text": segments, "language": "en", "full_text": " ".join(seg["text"] for seg in segments)}
+
+    def _speech_segments(self, start: float, end: float, regions: list = None) -> list:
+        # Like the real service, only the speech regions (when given) get segments
+        if regions is None:
+            return self._segments(start, end)
+        return [
+            segment
+            for region_start, region_end in regions if region_start < end and region_end > start
+            for segment in self._segments(max(region_start, start), min(region_end, end))
+        ]
+
+    def transcribe_audio(self, audio_path: str, language: str = None, regions: list = None) -> dict:
+        return self._result(self._speech_segments(0, self._duration(audio_path), regions))
+
+    def transcribe_batch(self, requests):
+        return [self.transcribe_audio(audio_path, regions=regions) for audio_path, _, regions in requests]
+
+    def transcribe_stream(self, audio_path: str, language: str = None, window: float = 60, regions: list = None):
+        duration = self._duration(audio_path)
+        position = 0.0
+        while position < duration:
+            end = min(position + window, duration)
+            yield "en", self._speech_segments(position, end, regions), end
+            position = end
+
+
+def make_video(path: Path, duration: float, speech: str = None):
+    """Test-pattern video with tone bursts (3s on, 1s off) or a looped recording as audio"""
+    if speech:
+        audio_input = ["-stream_loop", "-1", "-i", speech]
+    else:
+        audio_input = ["-f", "lavfi", "-i", f"aevalsrc='0.3*sin(2*PI*220*t)*lt(mod(t,4),3)':s=44100:d={duration}"]
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={duration}",
+        *audio_input,
+        "-t", str(duration),
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        str(path),
+    ], check=True)
+
+
+def cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def peak_rss_mb() -> tuple:
+    # ru_maxrss is in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+async def file_chunks(path: Path, chunk_size: int):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def run_job(pipeline, ingest, job_id: str, source_video: Path, args, work_dir: Path) -> dict:
+    """Run one job and return {stage: (wall, cpu)} plus its status"""
+    from services.ingest import INGEST_CHUNK_SIZE
+    from services.workspace import Workspace
+
+    workspace = Workspace(job_id, str(work_dir / "workspaces"))
+    marks = [("ingest", time.perf_counter(), cpu_seconds())]
+
+    upload = await ingest.ingest(
+        file_chunks(source_video, INGEST_CHUNK_SIZE),
+        video_path=str(workspace.file(source_video.name)),
+        audio_path=str(workspace.file("original_audio.wav")),
+    )
+
+    status = "failed"
+    error = None
+    async for event, data in pipeline.run(
+            job_id=job_id,
+            video_path=upload["video_path"],
+            filename=source_video.name,
+            target_language=args.target_language,
+            audio_path=upload["audio_path"],
+            duration=upload["duration"],
+    ):
+        if event == "progress" and data["stage"] != marks[-1][0]:
+            marks.append((data["stage"], time.perf_counter(), cpu_seconds()))
+        elif event == "complete":
+            status = "completed"
+        elif event == "error":
+            error = data.get("message")
+    marks.append(("done", time.perf_counter(), cpu_seconds()))
+
+    stages = {}
+    for (stage, wall, cpu), (_, next_wall, next_cpu) in zip(marks, marks[1:]):
+        previous_wall, previous_cpu = stages.get(stage, (0.0, 0.0))
+        stages[stage] = (previous_wall + next_wall - wall, previous_cpu + next_cpu - cpu)
+    return {"status": status, "error": error, "stages": stages, "wall": marks[-1][1] - marks[0][1]}
+
+
+async def benchmark(args, work_dir: Path):
+    # Imported here: the services read their configuration from the environment at import time
+    from services.ingest import StreamingIngest
+    from services.pipeline import DubbingPipeline
+
+    if args.asr == "fake":
+        transcription_service = FakeTranscriptionService(args.segment_length)
+    else:
+        from services.model_registry import model_registry
+        from services.transcription import TranscriptionService
+
+        started = time.perf_counter()
+        await asyncio.to_thread(model_registry.warm_up)
+        print(f"Model load: {time.perf_counter() - started:.2f}s")
+        transcription_service = TranscriptionService()
+
+    pipeline = DubbingPipeline(
+        transcription_service=transcription_service,
+        workspace_root=str(work_dir / "workspaces"),
+        output_dir=str(work_dir / "outputs"),
+    )
+    ingest = StreamingIngest()
+
+    source_video = work_dir / "synthetic.mp4"
+    print(f"Generating a {args.duration:g}s synthetic video...")
+    await asyncio.to_thread(make_video, source_video, args.duration, args.speech)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i: int):
+        async with semaphore:
+            return await run_job(pipeline, ingest, f"bench{i:04d}", source_video, args, work_dir)
+
+    print(f"Running {args.jobs} jobs, {args.concurrency} at a time...")
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*[limited(i) for i in range(args.jobs)])
+    finally:
+        await pipeline.aclose()
+    return results, time.perf_counter() - started
+
+
+def report(results: list, elapsed: float, args):
+    completed = [result for result in results if result["status"] == "completed"]
+    stages = [stage for stage in STAGE_ORDER if any(stage in result["stages"] for result in results)]
+    stages += sorted({stage for result in results for stage in result["stages"]} - set(stages))
+
+    print(f"\n{'=' * 60}")
+    print("PER-STAGE TIMES (seconds, per job)")
+    print(f"{'=' * 60}")
+    print(f"{'stage':<15}{'wall mean':>11}{'wall p50':>11}{'wall max':>11}{'cpu mean':>11}")
+    for stage in stages:
+        walls = [result["stages"][stage][0] for result in results if stage in result["stages"]]
+        cpus = [result["stages"][stage][1] for result in results if stage in result["stages"]]
+        print(f"{stage:<15}{statistics.mean(walls):>11.3f}{statistics.median(walls):>11.3f}"
+              f"{max(walls):>11.3f}{statistics.mean(cpus):>11.3f}")
+
+    own_rss, child_rss = peak_rss_mb()
+    job_walls = [result["wall"] for result in results]
+    print(f"\n{'=' * 60}")
+    print("SUMMARY")
+    print(f"{'=' * 60}")
+    print(f"Jobs: {len(results)} ({len(completed)} completed, {len(results) - len(completed)} failed)")
+    print(f"Concurrency: {args.concurrency}, video length: {args.duration:g}s, render mode: {args.render_mode}")
+    print(f"Total wall time: {elapsed:.2f}s")
+    print(f"Job latency: mean {statistics.mean(job_walls):.2f}s, max {max(job_walls):.2f}s")
+    print(f"Throughput: {len(completed) / elapsed * 60:.2f} jobs/min")
+    print(f"Peak RSS: {own_rss:.0f} MB (largest child process: {child_rss:.0f} MB)")
+
+    for result in results:
+        if result["error"]:
+            print(f"Error: {result['error']}")
+
+
+def main():
+    args = parse_args()
+
+    stub = TranslationStub(args.translation_latency)
+    stub.start()
+
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="dub-benchmark-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Working directory: {work_dir}")
+
+    os.environ.update({
+        "TRANSLATION_BACKEND": "mymemory",
+        "TRANSLATION_BACKEND_OVERRIDES": "",
+        "MYMEMORY_API_URL": stub.url,
+        "TRANSLATION_RATE_LIMIT": str(args.translation_rate),
+        "TRANSLATION_BURST": str(max(1, int(args.translation_rate))),
+        "TRANSLATION_CACHE_ENABLED": "0",
+        "TTS_BACKEND": "tone",
+        "TTS_CACHE_ENABLED": "0",
+        "DUB_RENDER_MODE": args.render_mode,
+        "WORKSPACE_ROOT": str(work_dir / "workspaces"),
+    })
+
+    try:
+        results, elapsed = asyncio.run(benchmark(args, work_dir))
+    finally:
+        stub.stop()
+    report(results, elapsed, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
 import asyncio
-import edge_tts
+import sys
 from pathlib import Path
 
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.tts_cache import TTSCache
+from services.tts_service import TTSService
+from services.voice_catalog import VoiceCatalog
+
+# Share the backend's TTS cache so regenerating samples only synthesizes new voices/texts
+tts_service = TTSService(cache=TTSCache(cache_dir=str(BACKEND_DIR / "cache" / "tts")))
+# Same snapshot as the API, so the voice list is only downloaded when it is stale
+voice_catalog = VoiceCatalog(snapshot_path=str(BACKEND_DIR / "cache" / "voices.json"))
+
 # Your target languages
 TARGET_LANGUAGES = {
     "ru": "ru-RU",
@@ -32,8 +44,8 @@ async def generate_voice_sample(voice_name: str, text: str, output_path: str, fo
     print(f"Generating sample for {voice_name}...")
 
     try:
-        communicate = edge_tts.Communicate(text, voice_name)
-        await communicate.save(output_path)
+        audio, _ = await tts_service.synthesize_clip(text, voice_name)
+        Path(output_path).write_bytes(audio)
         print(f"✓ Saved: {output_path}")
         return True
     except Exception as e:
@@ -57,7 +69,7 @@ async def generate_all_samples(base_dir: str = "../samples", formats: list = ["m
 
     # Get all available voices
     print("Fetching available voices...")
-    all_voices = await edge_tts.list_voices()
+    all_voices = await voice_catalog.find()
     print(f"Found {len(all_voices)} total voices\n")
 
     stats = {
@@ -73,10 +85,7 @@ async def generate_all_samples(base_dir: str = "../samples", formats: list = ["m
         print(f"{'=' * 60}")
 
         # Find matching voices
-        matching_voices = [
-            v for v in all_voices
-            if v['Locale'].startswith(locale_prefix)
-        ]
+        matching_voices = await voice_catalog.find(locale=locale_prefix)
 
         # Limit to max_voices
         total_found = len(matching_voices)
@@ -157,12 +166,7 @@ async def generate_samples_for_language(lang_code: str, base_dir: str = "../samp
         return
 
     locale_prefix = TARGET_LANGUAGES[lang_code]
-    all_voices = await edge_tts.list_voices()
-
-    matching_voices = [
-        v for v in all_voices
-        if v['Locale'].startswith(locale_prefix)
-    ]
+    matching_voices = await voice_catalog.find(locale=locale_prefix)
 
     # Limit to max_voices
     matching_voices = matching_voices[:max_voices]
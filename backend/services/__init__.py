@@ -1,8 +1,23 @@
 from .video import VideoService
 from .transcription import TranscriptionService
+from .transcription_batcher import TranscriptionBatcher
 from .translation import TranslationService
 from .tts_service import TTSService
+from .model_registry import ModelRegistry, model_registry
+from .job_store import JobStore
+from .hls_preview import HLSPreview
+from .pipeline import DubbingPipeline
+from .stage_graph import StageGraph
+from .worker_pool import WorkerPool
+from .workspace import Workspace
+from .translation_cache import TranslationCache
+from .tts_cache import TTSCache
+from .result_cache import ResultCache
+from .voice_catalog import VoiceCatalog, voice_catalog
+from .translation_backends import TranslationBackend, MyMemoryBackend, DeepLBackend, FakeBackend
 
-__all__ = ["VideoService", "TranscriptionService", "TranslationService", "TTSService"]
+__all__ = ["VideoService", "TranscriptionService", "TranscriptionBatcher", "TranslationService", "TTSService", "ModelRegistry", "model_registry",
+           "JobStore", "DubbingPipeline", "HLSPreview", "StageGraph", "WorkerPool", "Workspace", "TranslationCache", "TTSCache", "ResultCache", "VoiceCatalog", "voice_catalog",
+           "TranslationBackend", "MyMemoryBackend", "DeepLBackend", "FakeBackend"]
 
 all_services = [VideoService, TranscriptionService, TranslationService, TTSService]
\ No newline at end of file
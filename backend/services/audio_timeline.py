@@ -0,0 +1,69 @@
+import io
+import wave
+
+import av
+import numpy as np
+
+
+class AudioTimeline:
+    """
+    Preallocated PCM buffer for the dubbed track
+
+    Clips are written at their sample offset, gaps stay zero (silence), and
+    the WAV is written once at the end, so assembly is linear in the
+    length of the video instead of re-copying the track for every segment.
+    """
+
+    def __init__(self, duration: float, sample_rate: int = 44100, channels: int = 2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.samples = np.zeros((self.to_samples(duration), channels), dtype=np.int16)
+
+    def to_samples(self, seconds: float) -> int:
+        return max(0, int(round(seconds * self.sample_rate)))
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def place(self, start: float, clip: np.ndarray, duration: float = None):
+        """
+        Write a (frames, channels) int16 clip at `start` seconds
+
+        With `duration` the clip is trimmed or zero-padded to exactly that
+        length; anything past the end of the timeline is dropped.
+        """
+        offset = self.to_samples(start)
+        if duration is not None:
+            clip = clip[:self.to_samples(duration)]
+        end = min(offset + len(clip), len(self.samples))
+        if end <= offset:
+            return
+        self.samples[offset:end] = clip[:end - offset]
+        if duration is not None:
+            # Pad (silence) up to the exact target length, overwriting anything stale
+            pad_end = min(offset + self.to_samples(duration), len(self.samples))
+            self.samples[end:pad_end] = 0
+
+    def write_wav(self, path: str):
+        with wave.open(path, "wb") as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(self.samples.tobytes())
+
+
+
+def decode_audio(data: bytes, sample_rate: int = 44100, channels: int = 2) -> np.ndarray:
+    """Decode compressed audio bytes in-process into (frames, channels) int16 PCM"""
+    resampler = av.AudioResampler(format="s16", layout="stereo" if channels == 2 else "mono", rate=sample_rate)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(frame))
+    # Flush samples buffered inside the resampler
+    chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(None))
+
+    if not chunks:
+        return np.zeros((0, channels), dtype=np.int16)
+    return np.concatenate(chunks).reshape(-1, channels)
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+from typing import Optional
+
+from .workspace import Workspace
+
+# Pipeline stages in execution order
+STAGES = ["extract", "transcribe", "translate", "tts", "merge"]
+
+
+class JobManifest:
+    """
+    Record of the stages a job has completed, stored in its workspace
+
+    Each completed stage writes its output to `<stage>.json` next to
+    `manifest.json`, so a retried or requeued job can pick up after the
+    last completed stage instead of starting over.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, workspace: Workspace):
+        self.workspace = workspace
+        self.path = workspace.file(self.FILENAME)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.data = {"stages": {}}
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def last_completed(self) -> Optional[str]:
+        done = [stage for stage in STAGES if self.is_done(stage)]
+        return done[-1] if done else None
+
+    def load(self, stage: str) -> Optional[dict]:
+        """Output of a completed stage, or None if the stage has to run"""
+        if not self.is_done(stage):
+            return None
+        try:
+            with open(self.workspace.file(f"{stage}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def complete(self, stage: str, output: dict):
+        self._write(self.workspace.file(f"{stage}.json"), output)
+        self.data["stages"][stage] = {"completed_at": time.time()}
+        self._write(self.path, self.data)
+
+    @staticmethod
+    def _write(path, data: dict):
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
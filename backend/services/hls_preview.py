@@ -0,0 +1,142 @@
+import asyncio
+import math
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .video import VideoService
+
+# Opt-in: the preview re-encodes the whole video next to TTS
+HLS_PREVIEW_ENABLED = os.getenv("HLS_PREVIEW_ENABLED", "0") == "1"
+# Shorter videos finish quickly enough that a preview isn't worth the extra encode
+HLS_PREVIEW_MIN_DURATION = float(os.getenv("HLS_PREVIEW_MIN_DURATION", "30"))
+HLS_SEGMENT_SECONDS = float(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_PREVIEW_HEIGHT = int(os.getenv("HLS_PREVIEW_HEIGHT", "480"))
+# Public path of the preview files (served by the /video/preview route)
+HLS_PREVIEW_URL_PREFIX = os.getenv("HLS_PREVIEW_URL_PREFIX", "/api/v1/video/preview")
+# Previews of finished jobs are removed after this many seconds (the full output replaces them)
+HLS_PREVIEW_TTL = float(os.getenv("HLS_PREVIEW_TTL", "3600"))
+
+
+class HLSPreview:
+    """
+    Growing HLS playlist of the dubbed video, written while TTS is still running
+
+    The timeline is cut into windows of `segment_seconds`. Clips are added in
+    timeline order, so once a clip starting at t arrives every window ending
+    before t is final and is rendered (one ffmpeg run at a time, in the
+    background) and appended to the playlist. `finish` renders the rest and
+    closes the playlist.
+    """
+
+    PLAYLIST = "index.m3u8"
+
+    def __init__(
+            self,
+            job_id: str,
+            video_path: str,
+            duration: float,
+            output_dir: str,
+            video_service: VideoService = None,
+            segment_seconds: float = HLS_SEGMENT_SECONDS,
+            height: int = HLS_PREVIEW_HEIGHT,
+            variant: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        # Jobs rendering several dubs (one per language) keep one preview per variant
+        self.variant = variant
+        self.video_path = video_path
+        self.duration = duration
+        self.segment_seconds = segment_seconds
+        self.height = height
+        self.video_service = video_service or VideoService()
+        self.dir = Path(output_dir) / "previews" / job_id
+        if variant:
+            self.dir = self.dir / variant
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.clips: List[Dict] = []
+        self.windows = max(1, math.ceil(duration / segment_seconds))
+        self.queued = 0
+        self.written: List[float] = []
+        self.failed = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._render_windows())
+
+    @property
+    def url(self) -> str:
+        if self.variant:
+            return f"{HLS_PREVIEW_URL_PREFIX}/{self.job_id}/{self.variant}/{self.PLAYLIST}"
+        return f"{HLS_PREVIEW_URL_PREFIX}/{self.job_id}/{self.PLAYLIST}"
+
+    @property
+    def ready(self) -> bool:
+        """True once the playlist has at least one segment"""
+        return bool(self.written)
+
+    def advance(self, position: float, clip: Optional[Dict] = None):
+        """Record a clip (or an empty segment) starting at `position` and queue the windows it completes"""
+        if clip is not None:
+            self.clips.append(clip)
+        while self.queued < self.windows and (self.queued + 1) * self.segment_seconds <= position:
+            self._queue.put_nowait(self.queued)
+            self.queued += 1
+
+    async def finish(self):
+        """Render the remaining windows and end the playlist"""
+        while self.queued < self.windows:
+            self._queue.put_nowait(self.queued)
+            self.queued += 1
+        self._queue.put_nowait(None)
+        await self._worker
+        if not self.failed:
+            await asyncio.to_thread(self._write_playlist, True)
+
+    def cancel(self):
+        self._worker.cancel()
+
+    async def _render_windows(self):
+        while True:
+            window = await self._queue.get()
+            if window is None or self.failed:
+                return
+            start = window * self.segment_seconds
+            length = min(self.segment_seconds, self.duration - start)
+            try:
+                await asyncio.to_thread(
+                    self.video_service.render_preview_segment,
+                    self.video_path,
+                    list(self.clips),
+                    start,
+                    length,
+                    str(self.dir / self._segment_name(window)),
+                    self.height,
+                )
+            except Exception as e:
+                # The preview is best effort; the job itself carries on
+                print(f"HLS preview of job {self.job_id} stopped: {e}")
+                self.failed = True
+                return
+            self.written.append(length)
+            await asyncio.to_thread(self._write_playlist, False)
+
+    @staticmethod
+    def _segment_name(window: int) -> str:
+        return f"segment_{window:05d}.ts"
+
+    def _write_playlist(self, ended: bool):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{math.ceil(self.segment_seconds)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for window, length in enumerate(self.written):
+            lines += [f"#EXTINF:{length:.3f},", self._segment_name(window)]
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Players poll the playlist: replace it atomically
+        tmp_path = self.dir / f"{self.PLAYLIST}.tmp"
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.dir / self.PLAYLIST)
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import os
+import wave
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+
+from .metrics import track_call
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", str(1024 * 1024)))
+# Try to read the duration from the container header once this many bytes have arrived
+INGEST_PROBE_AFTER = int(os.getenv("INGEST_PROBE_AFTER", str(2 * 1024 * 1024)))
+# The piped WAV must cover this share of the video, otherwise the audio is extracted from the file
+INGEST_MIN_AUDIO_COVERAGE = float(os.getenv("INGEST_MIN_AUDIO_COVERAGE", "0.9"))
+
+
+class IngestRejected(Exception):
+    """The upload was refused before it finished (e.g. the video is too long)"""
+    pass
+
+
+async def iter_upload(upload, chunk_size: int = INGEST_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Async chunks of a FastAPI UploadFile"""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class StreamingIngest:
+    """
+    Writes an incoming video to disk while hashing it and extracting audio
+
+    The bytes are fed to an ffmpeg process as they arrive, which produces
+    the 16 kHz mono WAV for Whisper in the same pass. Containers that can't
+    be demuxed from a pipe (MP4 with the moov atom at the end) simply leave
+    `audio_path` unset and the pipeline extracts from the file instead.
+    ffmpeg may exit cleanly on those with a short or empty WAV, so the WAV
+    has to cover most of the probed duration to count.
+    The duration is probed from the partial file as soon as the header is
+    available, so over-long videos are rejected early.
+    """
+
+    async def ingest(
+            self,
+            chunks: AsyncIterator[bytes],
+            video_path: str,
+            audio_path: str,
+            max_duration: Optional[float] = None,
+    ) -> Dict:
+        hasher = hashlib.sha256()
+        size = 0
+        duration = None
+        next_probe = INGEST_PROBE_AFTER
+
+        # Spans the whole upload: ffmpeg extracts while the bytes arrive
+        with track_call("ffmpeg", "stream_extract"):
+            extractor = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-i", "pipe:0",
+                "-vn", "-acodec", "pcm_s16le", "-ac", "1", "-ar", "16000",
+                audio_path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            feeding = True
+
+            try:
+                async with aiofiles.open(video_path, "wb") as f:
+                    async for chunk in chunks:
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        await f.write(chunk)
+
+                        if feeding:
+                            feeding = await self._feed(extractor, chunk)
+
+                        if duration is None and size >= next_probe:
+                            await f.flush()
+                            duration = await probe_duration(video_path)
+                            # Header not there yet (or at the end of the file): try again later
+                            next_probe = size * 2
+                            self._check_duration(duration, max_duration)
+
+                if extractor.stdin is not None and not extractor.stdin.is_closing():
+                    extractor.stdin.close()
+                extracted = await extractor.wait() == 0 and feeding
+
+                # The early probe may have been an estimate from a partial file; confirm on the full one
+                duration = await probe_duration(video_path) or duration
+                self._check_duration(duration, max_duration)
+                if extracted:
+                    extracted = await asyncio.to_thread(self._covers, audio_path, duration)
+            except BaseException:
+                if extractor.returncode is None:
+                    extractor.kill()
+                    await extractor.wait()
+                Path(audio_path).unlink(missing_ok=True)
+                raise
+
+        if not extracted:
+            Path(audio_path).unlink(missing_ok=True)
+
+        return {
+            "video_path": video_path,
+            "audio_path": audio_path if extracted else None,
+            "content_hash": hasher.hexdigest(),
+            "size": size,
+            "duration": duration,
+        }
+
+    @staticmethod
+    async def _feed(process, chunk: bytes) -> bool:
+        """Send a chunk to ffmpeg; False once ffmpeg has given up on the stream"""
+        if process.returncode is not None:
+            return False
+        try:
+            process.stdin.write(chunk)
+            await process.stdin.drain()
+            return True
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+
+    @staticmethod
+    def _covers(audio_path: str, duration: Optional[float]) -> bool:
+        """True if the extracted WAV has (roughly) the whole audio of the video"""
+        try:
+            with wave.open(audio_path, "rb") as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+        except (OSError, EOFError, wave.Error):
+            return False
+        if seconds <= 0:
+            return False
+        if duration is None:
+            return True
+        covered = seconds >= duration * INGEST_MIN_AUDIO_COVERAGE
+        if not covered:
+            print(f"Streaming extraction stopped at {seconds:.1f}s of {duration:.1f}s, extracting from the file")
+        return covered
+
+    @staticmethod
+    def _check_duration(duration: Optional[float], max_duration: Optional[float]):
+        if duration is not None and max_duration is not None and duration > max_duration:
+            raise IngestRejected(f"Video duration is longer than {max_duration:g} seconds")
+
+
+async def probe_duration(video_path: str) -> Optional[float]:
+    """Container duration via ffprobe, or None if it can't be determined (yet)"""
+    with track_call("ffmpeg", "probe"):
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration:stream=duration",
+            "-of", "json",
+            video_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        return None
+    try:
+        info = json.loads(stdout)
+    except ValueError:
+        return None
+
+    for entry in [info.get("format", {})] + info.get("streams", []):
+        try:
+            return float(entry["duration"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "./jobs/jobs.db")
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+FINISHED_STATUSES = (COMPLETED, FAILED)
+
+# Marks where a retried job's new run begins in its event stream
+RETRY_EVENT = "retry"
+
+
+class JobStore:
+    """
+    SQLite-backed job queue shared by the API process and the workers
+
+    Jobs and their progress events are persisted so a client can reattach
+    to a job after a disconnect, and jobs owned by a dead worker can be
+    put back on the queue.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    def create_job(self, params: Dict, job_id: Optional[str] = None) -> str:
+        job_id = job_id or self.new_job_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(params), now, now)
+            )
+        return job_id
+
+    def create_finished_job(self, params: Dict, result: Dict, job_id: Optional[str] = None) -> str:
+        """Record a job that is already complete (e.g. served from the result cache)"""
+        job_id = job_id or self.new_job_id()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, result, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, COMPLETED, json.dumps(params), json.dumps(result), now, now)
+            )
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event, data, created_at) VALUES (?, 1, ?, ?, ?)",
+                (job_id, "complete", json.dumps(result), now)
+            )
+            conn.execute("COMMIT")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim_next_job(self, worker_id: str) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running and return it"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, time.time(), row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        job = self._row_to_job(row)
+        job["status"] = RUNNING
+        job["worker"] = worker_id
+        return job
+
+    def complete_job(self, job_id: str, result: Dict):
+        self._finish(job_id, COMPLETED, result=json.dumps(result))
+
+    def fail_job(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id: str, status: str, result: str = None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    def running_workers(self) -> List[str]:
+        """Workers that currently have a job marked running"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT worker FROM jobs WHERE status = ? AND worker IS NOT NULL", (RUNNING,)
+            ).fetchall()
+        return [row["worker"] for row in rows]
+
+    def requeue_running_jobs(self, worker_id: Optional[str] = None) -> int:
+        """Put running jobs (of one worker, or all of them) back on the queue"""
+        query = "UPDATE jobs SET status = ?, worker = NULL, updated_at = ? WHERE status = ?"
+        args = [QUEUED, time.time(), RUNNING]
+        if worker_id is not None:
+            query += " AND worker = ?"
+            args.append(worker_id)
+        with self._connect() as conn:
+            return conn.execute(query, args).rowcount
+
+    def retry_job(self, job_id: str) -> Optional[int]:
+        """
+        Put a failed job back on the queue; None if it isn't failed
+
+        Adds a "retry" event that separates the new run from the events of
+        the failed one, and returns its seq.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = conn.execute(
+                    "UPDATE jobs SET status = ?, error = NULL, worker = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                    (QUEUED, now, job_id, FAILED)
+                ).rowcount
+                if updated != 1:
+                    conn.execute("COMMIT")
+                    return None
+                seq = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO job_events (job_id, seq, event, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, seq, RETRY_EVENT, json.dumps({"stage": "retry", "message": "Job queued again", "progress": 0}), now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    def current_run_start(self, job_id: str) -> int:
+        """Seq after which the events of the job's latest run start (0 if it was never retried)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MAX(seq) FROM job_events WHERE job_id = ? AND event = ?", (job_id, RETRY_EVENT)
+            ).fetchone()
+        return row[0] - 1 if row[0] else 0
+
+    def add_event(self, job_id: str, event: str, data: Dict) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, event, json.dumps(data), time.time())
+            )
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            conn.execute("COMMIT")
+        return seq
+
+    def get_events(self, job_id: str, after_seq: int = 0) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq)
+            ).fetchall()
+        return [{"seq": row["seq"], "event": row["event"], "data": json.loads(row["data"])} for row in rows]
+
+    def last_event(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? ORDER BY seq DESC LIMIT 1",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"seq": row["seq"], "event": row["event"], "data": json.loads(row["data"])}
+
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "params": json.loads(row["params"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "worker": row["worker"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
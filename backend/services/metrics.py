@@ -0,0 +1,98 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+# Jobs run in separate worker processes, so metrics are shared through files.
+# The directory has to be known before prometheus_client is imported.
+METRICS_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "./metrics")
+Path(METRICS_DIR).mkdir(parents=True, exist_ok=True)
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1800)
+CALL_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "dub_stage_duration_seconds", "Wall time of a pipeline stage per job", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_FAILURES = Counter("dub_stage_failures_total", "Pipeline stages that raised", ["stage"])
+JOB_SECONDS = Histogram("dub_job_duration_seconds", "Wall time of a whole job", buckets=STAGE_BUCKETS)
+JOBS = Counter("dub_jobs_total", "Finished jobs by outcome", ["status"])
+CALL_SECONDS = Histogram(
+    "dub_external_call_duration_seconds",
+    "Duration of calls to ffmpeg, TTS and translation providers, and model loads",
+    ["service", "operation"],
+    buckets=CALL_BUCKETS,
+)
+CALL_ERRORS = Counter("dub_external_call_errors_total", "External calls that failed", ["service", "operation"])
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def track_call(service: str, operation: str):
+    """Time a call to an external tool or service (works around sync and async code)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        CALL_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        CALL_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+
+
+class JobTimer:
+    """Per-job stage timings, also exported as STAGE_SECONDS"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_FAILURES.labels(name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            STAGE_SECONDS.labels(name).observe(elapsed)
+
+    def finish(self, status: str) -> Dict[str, float]:
+        """Count the job and return its breakdown in seconds, including the total"""
+        total = time.perf_counter() - self.started
+        JOBS.labels(status).inc()
+        JOB_SECONDS.observe(total)
+        return {**{name: round(seconds, 3) for name, seconds in self.timings.items()}, "total": round(total, 3)}
+
+
+def reset_metrics():
+    """Drop the samples left by processes that are gone; call once before the worker processes start"""
+    for path in Path(METRICS_DIR).glob("*.db"):
+        # Files are named <type>_<pid>.db (e.g. histogram_1234.db)
+        pid = path.stem.rsplit("_", 1)[-1]
+        if pid.isdigit() and not process_alive(int(pid)):
+            path.unlink(missing_ok=True)
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def render_metrics() -> bytes:
+    """Metrics of all processes in the Prometheus text format"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
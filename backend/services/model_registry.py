@@ -0,0 +1,128 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+import whisperx
+
+from .metrics import track_call
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float16" if WHISPER_DEVICE == "cuda" else "int8")
+ALIGN_MODEL_CACHE_SIZE = int(os.getenv("ALIGN_MODEL_CACHE_SIZE", "4"))
+ALIGN_MODEL_MEMORY_MB = int(os.getenv("ALIGN_MODEL_MEMORY_MB", "2048"))
+PRELOAD_ALIGN_LANGUAGES = [
+    lang for lang in os.getenv("PRELOAD_ALIGN_LANGUAGES", "en").split(",") if lang
+]
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for WhisperX models
+
+    The ASR model is loaded once and kept for the lifetime of the process.
+    Alignment models are kept in an LRU keyed by language code and evicted
+    when either the entry limit or the memory budget is exceeded.
+    """
+
+    def __init__(
+            self,
+            model_name: str = WHISPER_MODEL,
+            device: str = WHISPER_DEVICE,
+            compute_type: str = WHISPER_COMPUTE_TYPE,
+            max_align_models: int = ALIGN_MODEL_CACHE_SIZE,
+            align_memory_mb: int = ALIGN_MODEL_MEMORY_MB,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.max_align_models = max_align_models
+        self.align_memory_bytes = align_memory_mb * 1024 * 1024
+
+        self._lock = threading.Lock()
+        # WhisperX models aren't thread-safe (transcribe swaps the model's tokenizer),
+        # so ASR and alignment calls of all jobs in the process run one at a time
+        self.inference_lock = threading.Lock()
+        self._asr_model = None
+        # language -> (model, metadata, size in bytes)
+        self._align_models = OrderedDict()
+        self._align_bytes = 0
+
+    def get_asr_model(self):
+        """Return the shared ASR model, loading it on first use"""
+        if self._asr_model is None:
+            with self._lock:
+                if self._asr_model is None:
+                    print(f"Loading WhisperX model '{self.model_name}' ({self.device}, {self.compute_type})")
+                    with track_call("model_load", "asr"):
+                        self._asr_model = whisperx.load_model(
+                            self.model_name,
+                            self.device,
+                            compute_type=self.compute_type
+                        )
+        return self._asr_model
+
+    def get_align_model(self, language: str):
+        """Return (model, metadata) for the language, loading and caching it if needed"""
+        with self._lock:
+            entry = self._align_models.get(language)
+            if entry is not None:
+                self._align_models.move_to_end(language)
+                return entry[0], entry[1]
+
+            print(f"Loading alignment model for '{language}'")
+            with track_call("model_load", "align"):
+                model, metadata = whisperx.load_align_model(
+                    language_code=language,
+                    device=self.device
+                )
+            size = self._model_size(model)
+            self._align_models[language] = (model, metadata, size)
+            self._align_bytes += size
+            self._evict()
+            return model, metadata
+
+    def warm_up(self, languages=None):
+        """Load the ASR model and the given alignment models ahead of the first request"""
+        self.get_asr_model()
+        for language in (PRELOAD_ALIGN_LANGUAGES if languages is None else languages):
+            self.get_align_model(language)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "asr_model": self.model_name if self._asr_model is not None else None,
+                "align_models": list(self._align_models.keys()),
+                "align_memory_mb": round(self._align_bytes / (1024 * 1024), 1),
+            }
+
+    def _evict(self):
+        """Drop least recently used alignment models until within limits (caller holds the lock)"""
+        evicted = False
+        while len(self._align_models) > 1 and (
+                len(self._align_models) > self.max_align_models
+                or self._align_bytes > self.align_memory_bytes
+        ):
+            language, (_, _, size) = self._align_models.popitem(last=False)
+            self._align_bytes -= size
+            evicted = True
+            print(f"Evicted alignment model for '{language}'")
+
+        if evicted:
+            gc.collect()
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+
+    @staticmethod
+    def _model_size(model) -> int:
+        try:
+            params = sum(p.numel() * p.element_size() for p in model.parameters())
+            buffers = sum(b.numel() * b.element_size() for b in model.buffers())
+            return params + buffers
+        except AttributeError:
+            return 0
+
+
+model_registry = ModelRegistry()
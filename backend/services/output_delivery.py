@@ -0,0 +1,84 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+# e.g. "/protected-outputs/": nginx serves the file from its internal location of that name
+OUTPUT_ACCEL_REDIRECT_PREFIX = os.getenv("OUTPUT_ACCEL_REDIRECT_PREFIX", "")
+# Outputs never change once written (every job has its own file name)
+OUTPUT_MAX_AGE = int(os.getenv("OUTPUT_MAX_AGE", "86400"))
+
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".m4v": "video/mp4",
+    ".mov": "video/quicktime",
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
+class OutputDelivery:
+    """
+    Serves rendered videos with conditional GET, Range and nginx offload
+
+    Every response carries an ETag (from size and mtime) and answers
+    If-None-Match with 304. With `accel_prefix` set, the body is left to
+    nginx through X-Accel-Redirect; otherwise Starlette's FileResponse
+    streams it and handles Range/If-Range (206) itself.
+    """
+
+    def __init__(
+            self,
+            output_dir: str = "./outputs",
+            accel_prefix: str = OUTPUT_ACCEL_REDIRECT_PREFIX,
+            max_age: int = OUTPUT_MAX_AGE,
+    ):
+        self.output_dir = Path(output_dir)
+        self.accel_prefix = accel_prefix
+        self.max_age = max_age
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """Path of an output file, or None if it doesn't exist or lies outside the output dir"""
+        path = (self.output_dir / name).resolve()
+        if path.parent != self.output_dir.resolve() or not path.is_file():
+            return None
+        return path
+
+    def response(self, request: Request, path: Path, inline: bool = False) -> Response:
+        stat = path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        disposition = "inline" if inline else "attachment"
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={self.max_age}",
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": content_disposition(disposition, path.name),
+        }
+
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={key: headers[key] for key in ("ETag", "Cache-Control")})
+
+        media_type = MEDIA_TYPES.get(path.suffix.lower(), "application/octet-stream")
+        if self.accel_prefix:
+            # nginx sends the file (with Range support) without going through uvicorn
+            headers["X-Accel-Redirect"] = f"{self.accel_prefix.rstrip('/')}/{quote(path.name)}"
+            return Response(headers=headers, media_type=media_type)
+
+        return FileResponse(path=path, media_type=media_type, headers=headers, stat_result=stat)
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """
+    Content-Disposition that survives any file name
+
+    Header values must be latin-1, so the name is sent percent-encoded
+    (RFC 5987 filename*) with an ASCII-only filename for old clients.
+    """
+    fallback = re.sub(r'[^A-Za-z0-9._-]', "_", filename)
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
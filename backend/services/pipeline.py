@@ -0,0 +1,663 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .checkpoint import JobManifest
+from .hls_preview import HLSPreview, HLS_PREVIEW_ENABLED, HLS_PREVIEW_MIN_DURATION
+from .metrics import JobTimer
+from .model_registry import WHISPER_MODEL
+from .resegment import RESEGMENT_ENABLED, SEGMENTATION_KEY, resegment
+from .result_cache import ResultCache, transcript_key
+from .stage_graph import StageGraph
+from .video import VideoService
+from .transcription import TranscriptionService, TRANSCRIPTION_WINDOW
+from .transcription_batcher import TranscriptionBatcher
+from .translation import TranslationService
+from .tts_service import TTSService
+from .vad import VAD_ENABLED, VAD_KEY, file_speech_regions
+from .workspace import Workspace, WORKSPACE_ROOT
+
+# "graph": mix + mux the TTS clips in one ffmpeg pass; "timeline": assemble a WAV in NumPy, then mux
+DUB_RENDER_MODE = os.getenv("DUB_RENDER_MODE", "graph")
+
+
+class WindowTranslations:
+    """
+    Translations of a long video's windows into one language, in window order
+
+    `_transcribe` adds a translation task per window while the next window is
+    recognized and closes the stream after the last one; `_dub` iterates the
+    translated texts as the tasks finish.
+    """
+
+    def __init__(self):
+        self.tasks: List[asyncio.Task] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def add(self, task: asyncio.Task):
+        self.tasks.append(task)
+        self._queue.put_nowait(task)
+
+    def close(self):
+        self._queue.put_nowait(None)
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            task = await self._queue.get()
+            if task is None:
+                return
+            for translated in await task:
+                yield translated
+
+
+class DubbingPipeline:
+    """
+    Runs the dubbing stages for one video and yields (event, data) progress events
+
+    Blocking stages (ffmpeg, WhisperX) run in threads so several jobs can
+    share one event loop.
+    """
+
+    def __init__(
+            self,
+            video_service: VideoService = None,
+            transcription_service: TranscriptionService = None,
+            translation_service: TranslationService = None,
+            tts_service: TTSService = None,
+            workspace_root: str = WORKSPACE_ROOT,
+            output_dir: str = "./outputs",
+            result_cache: ResultCache = None,
+            transcription_batcher: TranscriptionBatcher = None,
+    ):
+        self.video_service = video_service or VideoService()
+        self.transcription_service = transcription_service or TranscriptionService()
+        # Concurrent jobs on this loop share batched ASR calls
+        self.transcription_batcher = transcription_batcher or TranscriptionBatcher(self.transcription_service)
+        self.translation_service = translation_service or TranslationService()
+        self.tts_service = tts_service or TTSService()
+        self.workspace_root = workspace_root
+        self.output_dir = Path(output_dir)
+        self.result_cache = result_cache or ResultCache(output_dir=output_dir)
+
+    async def aclose(self):
+        await self.transcription_batcher.aclose()
+        await self.translation_service.aclose()
+
+    async def run(
+            self,
+            job_id: str,
+            video_path: str,
+            filename: str,
+            target_language: str,
+            voice: Optional[str] = None,
+            max_duration: Optional[float] = None,
+            audio_path: Optional[str] = None,
+            duration: Optional[float] = None,
+            content_hash: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        print(f"Processing {target_language} {voice}")
+        self.output_dir.mkdir(exist_ok=True)
+        workspace = Workspace(job_id, self.workspace_root)
+        manifest = JobManifest(workspace)
+        succeeded = False
+        early_translations = {target_language: WindowTranslations()}
+        timer = JobTimer()
+
+        try:
+            # Identical upload, language and voice already rendered: reuse the output
+            if content_hash:
+                cached_result = await asyncio.to_thread(
+                    self.result_cache.get_result, content_hash, target_language, voice
+                )
+                if cached_result is not None:
+                    succeeded = True
+                    yield "complete", {**cached_result, "cached": True, "timings": timer.finish("cached")}
+                    return
+
+            resumed_after = manifest.last_completed()
+            if resumed_after:
+                yield "progress", {"stage": "resume", "message": f"Resuming after the '{resumed_after}' stage", "progress": 5}
+
+            def start_dubs(transcription: dict, duration: float, streaming: bool):
+                return {target_language: self._dub(
+                    job_id, workspace, manifest, timer, video_path, duration, transcription, content_hash,
+                    target_language, voice, early_translations[target_language] if streaming else None,
+                    self.output_dir / f"dubbed_{job_id}_{filename}",
+                )}
+
+            result = None
+            transcribing = self._transcribe(
+                workspace, manifest, timer, video_path, audio_path, duration, max_duration, content_hash,
+                early_translations,
+            )
+            async for _, event, data in self._run_dubs(transcribing, start_dubs):
+                if event == "dubbed":
+                    result = data
+                elif event == "error":
+                    raise Exception(data["message"])
+                else:
+                    yield event, data
+
+            succeeded = True
+            yield "complete", {**result, "timings": timer.finish("completed")}
+
+        except Exception as e:
+            yield "error", {"message": str(e), "progress": 0, "timings": timer.finish("failed")}
+        finally:
+            # Failed jobs keep their workspace (upload + checkpoints) so a retry can resume;
+            # the sweeper removes it if nobody retries
+            for translations in early_translations.values():
+                translations.cancel()
+            if succeeded:
+                workspace.cleanup()
+
+    async def run_multi(
+            self,
+            job_id: str,
+            video_path: str,
+            filename: str,
+            targets: List[Dict],
+            max_duration: Optional[float] = None,
+            audio_path: Optional[str] = None,
+            duration: Optional[float] = None,
+            content_hash: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Dub one video into several languages, sharing extraction and transcription
+
+        `targets` is a list of {"language", "voice"} dicts. After the shared
+        stages every language is translated, synthesized and muxed
+        concurrently; its events carry a "language" key, and it ends with a
+        "language_complete" or "language_error" event. The job completes
+        (with the per-language results) if at least one language succeeded.
+        """
+        print(f"Processing {', '.join(target['language'] for target in targets)}")
+        self.output_dir.mkdir(exist_ok=True)
+        workspace = Workspace(job_id, self.workspace_root)
+        manifest = JobManifest(workspace)
+        succeeded = False
+        results = {}
+        errors = {}
+        early_translations = {}
+        timer = JobTimer()
+
+        try:
+            # Languages already rendered for this upload are answered from the cache
+            pending = []
+            for target in targets:
+                language = target["language"]
+                cached_result = None
+                if content_hash:
+                    cached_result = await asyncio.to_thread(
+                        self.result_cache.get_result, content_hash, language, target.get("voice")
+                    )
+                if cached_result is not None:
+                    results[language] = {**cached_result, "cached": True}
+                    yield "language_complete", {**results[language], "language": language}
+                else:
+                    pending.append(target)
+                    early_translations[language] = WindowTranslations()
+
+            if pending:
+                resumed_after = manifest.last_completed()
+                if resumed_after:
+                    yield "progress", {"stage": "resume", "message": f"Resuming after the '{resumed_after}' stage", "progress": 5}
+
+                # Every language gets its own checkpoints and scratch files
+                def start_dubs(transcription: dict, duration: float, streaming: bool):
+                    return {
+                        target["language"]: self._dub(
+                            job_id, workspace.subspace(target["language"]),
+                            JobManifest(workspace.subspace(target["language"])), timer, video_path, duration,
+                            transcription, content_hash, target["language"], target.get("voice"),
+                            early_translations[target["language"]] if streaming else None,
+                            self.output_dir / f"dubbed_{job_id}_{target['language']}_{filename}",
+                            preview_variant=target["language"],
+                        )
+                        for target in pending
+                    }
+
+                transcribing = self._transcribe(
+                    workspace, manifest, timer, video_path, audio_path, duration, max_duration, content_hash,
+                    early_translations,
+                )
+                async for language, event, data in self._run_dubs(transcribing, start_dubs):
+                    if language is None:
+                        yield event, data
+                    elif event == "dubbed":
+                        results[language] = data
+                        yield "language_complete", {**data, "language": language}
+                    elif event == "error":
+                        errors[language] = data["message"]
+                        yield "language_error", {**data, "language": language}
+                    else:
+                        yield event, {**data, "language": language}
+
+            if not results:
+                raise Exception("; ".join(f"{language}: {error}" for language, error in errors.items()))
+
+            result = {
+                "status": "success",
+                "original_language": next(iter(results.values())).get("original_language", "unknown"),
+                "results": results,
+                "errors": errors,
+                "progress": 100,
+            }
+            succeeded = True
+            yield "complete", {**result, "timings": timer.finish("completed")}
+
+        except Exception as e:
+            yield "error", {"message": str(e), "progress": 0, "timings": timer.finish("failed")}
+        finally:
+            for translations in early_translations.values():
+                translations.cancel()
+            if succeeded:
+                workspace.cleanup()
+
+    async def _transcribe(
+            self,
+            workspace: Workspace,
+            manifest: JobManifest,
+            timer: JobTimer,
+            video_path: str,
+            audio_path: Optional[str],
+            duration: Optional[float],
+            max_duration: Optional[float],
+            content_hash: Optional[str],
+            early_translations: Dict[str, WindowTranslations],
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Shared stages: extract, VAD and transcribe (each skipped if checkpointed or cached)
+
+        Progress events are yielded as usual; the last event is
+        ("transcribed", {"transcription", "duration"}). Long videos start
+        translating every window into each language of `early_translations`
+        while the next window is recognized. Once their language is known they
+        also yield ("streaming", {"transcription", "duration"}) with a
+        transcription whose segments keep growing until the stream is closed,
+        so dubbing can start before the last window.
+        """
+        # Ingest usually measured the duration already
+        if duration is None:
+            duration = await asyncio.to_thread(self.video_service.get_video_duration, video_path)
+
+        if max_duration is not None and duration > max_duration:
+            raise Exception(f"Video duration is longer than {max_duration:g} seconds")
+
+        # Progress: Upload complete
+        yield "progress", {"stage": "upload", "message": "Video uploaded successfully", "progress": 10}
+
+        transcription = manifest.load("transcribe")
+        if transcription is None and content_hash:
+            transcription = await asyncio.to_thread(
+                self.result_cache.get_stage, "transcripts", content_hash, WHISPER_MODEL, VAD_KEY, SEGMENTATION_KEY
+            )
+
+        if transcription is None:
+            # 1. Extract clean WAV audio (16kHz is best for Whisper)
+            yield "progress", {"stage": "extract_audio", "message": "Extracting audio from video...", "progress": 20}
+            with timer.stage("extract"):
+                extracted = manifest.load("extract")
+                if extracted is not None and Path(extracted["audio_path"]).exists():
+                    audio_path = extracted["audio_path"]
+                else:
+                    # Streaming ingest extracts the audio while the upload arrives; fall back to the file otherwise
+                    if not audio_path or not Path(audio_path).exists():
+                        audio_path = workspace.file("original_audio.wav")
+                        await asyncio.to_thread(self.video_service.extract_audio_from_video, video_path, str(audio_path))
+                    extracted = {"audio_path": str(audio_path)}
+
+            # VAD pre-pass: ASR only sees the speech regions, and segment bounds are fitted to them
+            regions = extracted.get("speech_regions")
+            if "speech_regions" not in extracted and VAD_ENABLED:
+                with timer.stage("vad"):
+                    regions = await asyncio.to_thread(file_speech_regions, str(audio_path))
+                extracted["speech_regions"] = regions
+            manifest.complete("extract", extracted)
+            if regions is not None:
+                speech_seconds = sum(end - start for start, end in regions)
+                print(f"Speech in {speech_seconds:.0f}s of {duration:.0f}s ({len(regions)} regions)")
+            elif VAD_ENABLED:
+                # WhisperX's own VAD still skips the silence it finds
+                print("VAD found too little speech to trust, transcribing the whole audio")
+            yield "progress", {"stage": "extract_audio", "message": "Audio extracted successfully", "progress": 30}
+
+            # 2. Transcribe with WhisperX (gives perfect word-level timestamps)
+            yield "progress", {"stage": "transcribe", "message": "Transcribing audio...", "progress": 40}
+            with timer.stage("transcribe"):
+                if duration > TRANSCRIPTION_WINDOW:
+                    # Long video: recognize pause-bounded windows one after another and
+                    # start translating each window while the next one is recognized
+                    segments = []
+                    language = None
+                    transcription = None
+                    async for language, window_segments, position in self._transcribe_windows(str(audio_path), regions):
+                        targets = [target for target in early_translations if target != language]
+                        if not targets:
+                            raise Exception("Same language")
+                        if RESEGMENT_ENABLED:
+                            # Merged per window: the early translations are made of these units
+                            window_segments = resegment(window_segments)
+                        # Extended before the translations are queued: _dub indexes the segments by them
+                        segments.extend(window_segments)
+                        texts = [seg["text"] for seg in window_segments]
+                        for target in targets:
+                            early_translations[target].add(asyncio.create_task(
+                                self._translate_texts(texts, language, target)
+                            ))
+                        if transcription is None and language is not None:
+                            transcription = {"text": segments, "language": language, "full_text": ""}
+                            yield "streaming", {"transcription": transcription, "duration": duration}
+                        yield "progress", {
+                            "stage": "transcribe",
+                            "message": f"Transcribed {min(position, duration):.0f}/{duration:.0f} seconds",
+                            "progress": 40 + int(min(position / duration, 1) * 10)
+                        }
+                    for translations in early_translations.values():
+                        translations.close()
+                    if transcription is None:
+                        transcription = {"text": segments, "language": language}
+                    transcription["full_text"] = " ".join([seg["text"] for seg in segments])
+                else:
+                    transcription = await self.transcription_batcher.transcribe(str(audio_path), regions=regions)
+                    if RESEGMENT_ENABLED:
+                        # Fewer, sentence-sized units: one translation, TTS call and clip each
+                        segment_count = len(transcription["text"])
+                        transcription["text"] = resegment(transcription["text"])
+                        print(f"Merged {segment_count} segments into {len(transcription['text'])}")
+            if content_hash:
+                await asyncio.to_thread(
+                    self.result_cache.put_stage, "transcripts", transcription, content_hash, WHISPER_MODEL, VAD_KEY,
+                    SEGMENTATION_KEY
+                )
+        if not manifest.is_done("transcribe"):
+            manifest.complete("transcribe", transcription)
+        yield "progress", {"stage": "transcribe", "message": f"Transcription complete. Found {len(transcription['text'])} segments.", "progress": 50}
+        yield "transcribed", {"transcription": transcription, "duration": duration}
+
+    async def _dub(
+            self,
+            job_id: str,
+            workspace: Workspace,
+            manifest: JobManifest,
+            timer: JobTimer,
+            video_path: str,
+            duration: float,
+            transcription: dict,
+            content_hash: Optional[str],
+            target_language: str,
+            voice: Optional[str],
+            early_translations: Optional[WindowTranslations],
+            output_video_path: Path,
+            preview_variant: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Per-language stages: translate, TTS and merge (each skipped if checkpointed)
+
+        Progress events are yielded as usual; the last event is
+        ("dubbed", result). `voice` None means the default voice of the language.
+        With `early_translations` the transcription is still growing window by
+        window: segments are synthesized as their window's translation arrives.
+        """
+        requested_voice = voice
+        voice = voice or self.tts_service.get_voice_for_language(target_language)
+        preview = None
+
+        try:
+            # 3 + 4. Translate and synthesize segment by segment: a segment is in TTS while
+            # later ones are still being translated, and results are collected in timeline order
+            yield "progress", {"stage": "translate", "message": "Translating segments...", "progress": 55}
+            if transcription.get("language") == target_language:
+                raise Exception("Same language")
+            speech = manifest.load("tts")
+            if speech is None or not all(Path(path).exists() for path in self._speech_files(speech)):
+                cached_translations = manifest.load("translate")
+                # A transcript still being recognized has no cache key yet
+                if cached_translations is None and content_hash and early_translations is None:
+                    cached_translations = await asyncio.to_thread(
+                        self.result_cache.get_stage, "translations", content_hash, target_language,
+                        transcript_key(transcription)
+                    )
+
+                if cached_translations is not None:
+                    translated_segments = cached_translations["segments"]
+                    source = self._enumerate(translated_segments)
+                else:
+                    translated_segments = []
+                    source = self._translate_segments(
+                        transcription["text"],
+                        transcription.get("language") or "en",
+                        target_language,
+                        early_translations,
+                        translated_segments,
+                        timer,
+                    )
+
+                if DUB_RENDER_MODE == "graph":
+                    async def synthesize(item):
+                        i, seg = item
+                        return seg, await self.tts_service.prepare_clip(seg, str(voice), workspace.file(f"tts_{i}{self.tts_service.suffix}"))
+                    timeline = None
+                    if HLS_PREVIEW_ENABLED and duration >= HLS_PREVIEW_MIN_DURATION:
+                        # Playable HLS of the finished part of the dub while the rest is synthesized
+                        preview = HLSPreview(
+                            job_id, video_path, duration, str(self.output_dir), self.video_service,
+                            variant=preview_variant,
+                        )
+                else:
+                    async def synthesize(item):
+                        _, seg = item
+                        return seg, await self.tts_service.render_segment(seg, str(voice))
+                    timeline = self.tts_service.new_timeline(transcription["text"], duration)
+
+                with timer.stage("tts"):
+                    graph = StageGraph().add_stage("tts", synthesize, workers=self.tts_service.concurrency)
+                    clips = []
+                    synthesized = 0
+                    preview_announced = False
+                    async for seg, output in graph.run(source):
+                        synthesized += 1
+                        if output is not None:
+                            if timeline is None:
+                                clips.append(output)
+                            else:
+                                timeline.place(seg["start"], output, duration=seg["duration"])
+                        if preview is not None:
+                            preview.advance(seg["start"], output)
+                            if preview.ready and not preview_announced:
+                                preview_announced = True
+                                yield "preview", {"playlist_url": preview.url}
+                        total_segments = len(transcription["text"])
+                        if early_translations is not None:
+                            # The segment count grows while recognition goes on; report by position
+                            done = min(seg["end"] / max(duration, 1e-6), 1)
+                        else:
+                            done = synthesized / max(total_segments, 1)
+                        yield "progress", {
+                            "stage": "tts",
+                            "message": f"Translated {len(translated_segments)}/{total_segments}, "
+                                       f"synthesized {synthesized}/{total_segments} segments",
+                            "progress": 55 + int(done * 30)
+                        }
+
+                    if timeline is None:
+                        speech = {"clips": clips}
+                    else:
+                        final_audio_path = workspace.file("final_dubbed_audio.wav")
+                        await asyncio.to_thread(timeline.write_wav, str(final_audio_path))
+                        speech = {"audio_path": str(final_audio_path)}
+
+                if cached_translations is None and content_hash:
+                    await asyncio.to_thread(
+                        self.result_cache.put_stage, "translations", {"segments": translated_segments},
+                        content_hash, target_language, transcript_key(transcription)
+                    )
+                if not manifest.is_done("translate"):
+                    manifest.complete("translate", {"segments": translated_segments})
+                manifest.complete("tts", speech)
+            yield "progress", {"stage": "tts", "message": "Speech generation complete", "progress": 85}
+
+            # 5. Mux the dubbed audio with the video
+            yield "progress", {"stage": "merge", "message": "Merging audio with video...", "progress": 90}
+            # The preview's last segments render alongside the final mux
+            preview_finished = asyncio.create_task(preview.finish()) if preview is not None else None
+            with timer.stage("merge"):
+                if "clips" in speech:
+                    # Mix the clips and mux with the video in one ffmpeg pass
+                    await asyncio.to_thread(
+                        self.video_service.render_dub,
+                        video_path=video_path,
+                        clips=speech["clips"],
+                        output_path=str(output_video_path),
+                        duration=duration,
+                    )
+                else:
+                    # Replace audio with perfect length match
+                    await asyncio.to_thread(
+                        self.video_service.replace_audio_perfect_sync,
+                        video_path=video_path,
+                        audio_path=speech["audio_path"],
+                        output_path=str(output_video_path)
+                    )
+            if preview_finished is not None:
+                await preview_finished
+            yield "progress", {"stage": "merge", "message": "Video processing complete", "progress": 95}
+
+            # Final success event
+            result = {
+                "status": "success",
+                "translated_video": f"/{output_video_path.name}",
+                "original_language": transcription.get("language", "unknown"),
+                "target_language": target_language,
+                "progress": 100
+            }
+            if preview is not None and not preview.failed:
+                result["preview_url"] = preview.url
+            manifest.complete("merge", result)
+            if content_hash:
+                await asyncio.to_thread(
+                    self.result_cache.put_result, content_hash, target_language, requested_voice, result
+                )
+            yield "dubbed", result
+        finally:
+            if preview is not None:
+                preview.cancel()
+
+    @staticmethod
+    async def _run_dubs(
+            transcribing: AsyncIterator[Tuple[str, dict]],
+            start_dubs: Callable[[dict, float, bool], Dict[str, AsyncIterator[Tuple[str, dict]]]],
+    ) -> AsyncIterator[Tuple[Optional[str], str, dict]]:
+        """
+        Run the shared stages and the per-language streams, yielding (language, event, data) as they come
+
+        Events of the shared stages have language None, and an error in them
+        is raised. The per-language streams are created by
+        `start_dubs(transcription, duration, streaming)` on the first
+        "streaming" or "transcribed" event and run concurrently, also with the
+        rest of a streamed transcription. A failing language ends with an
+        ("error", {"message"}) event instead of stopping the others.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def drain(language: Optional[str], stream: AsyncIterator[Tuple[str, dict]]):
+            try:
+                async for event, data in stream:
+                    await queue.put((language, event, data))
+            except Exception as e:
+                await queue.put((language, "error", {"message": str(e), "progress": 0}))
+            finally:
+                await queue.put((language, None, None))
+
+        tasks = [asyncio.create_task(drain(None, transcribing))]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                language, event, data = await queue.get()
+                if event is None:
+                    remaining -= 1
+                elif language is None and event == "error":
+                    raise Exception(data["message"])
+                elif language is None and event in ("streaming", "transcribed"):
+                    if len(tasks) == 1:
+                        dubs = start_dubs(data["transcription"], data["duration"], event == "streaming")
+                        tasks += [asyncio.create_task(drain(lang, dub)) for lang, dub in dubs.items()]
+                        remaining += len(dubs)
+                else:
+                    yield language, event, data
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _transcribe_windows(self, audio_path: str, regions: list = None) -> AsyncIterator[Tuple[str, list, float]]:
+        """TranscriptionService.transcribe_stream, advanced on a worker thread"""
+        windows = self.transcription_service.transcribe_stream(audio_path, regions=regions)
+        try:
+            while True:
+                window = await asyncio.to_thread(next, windows, None)
+                if window is None:
+                    return
+                yield window
+        finally:
+            windows.close()
+
+    async def _translate_segments(
+            self,
+            segments: list,
+            source_lang: str,
+            target_lang: str,
+            early_translations: Optional[WindowTranslations],
+            translated_segments: list,
+            timer: JobTimer,
+    ) -> AsyncIterator[Tuple[int, dict]]:
+        """
+        Translated segments in timeline order, as soon as each one is ready
+
+        Uses the per-window translations started during long-video
+        transcription when given. Every segment is also appended
+        to `translated_segments`.
+        """
+        if early_translations is not None:
+            translations = early_translations
+        else:
+            translations = (
+                translated async for _, translated in self.translation_service.translate_many(
+                    [seg["text"] for seg in segments], source_lang=source_lang, target_lang=target_lang
+                )
+            )
+
+        with timer.stage("translate"):
+            async for translated in translations:
+                seg = segments[len(translated_segments)]
+                translated_seg = {
+                    "start": seg["start"],
+                    "end": seg["end"],
+                    "duration": seg["end"] - seg["start"],
+                    "translated_text": translated
+                }
+                translated_segments.append(translated_seg)
+                yield len(translated_segments) - 1, translated_seg
+
+    @staticmethod
+    async def _enumerate(items: list) -> AsyncIterator[Tuple[int, dict]]:
+        for item in enumerate(items):
+            yield item
+
+    async def _translate_texts(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        translations = [""] * len(texts)
+        async for idx, translated in self.translation_service.translate_many(
+                texts, source_lang=source_lang or "en", target_lang=target_lang
+        ):
+            translations[idx] = translated
+        return translations
+
+    @staticmethod
+    def _speech_files(speech: dict):
+        if "clips" in speech:
+            return [clip["path"] for clip in speech["clips"]]
+        return [speech["audio_path"]]
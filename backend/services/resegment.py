@@ -0,0 +1,78 @@
+import os
+from typing import Dict, List
+
+RESEGMENT_ENABLED = os.getenv("RESEGMENT_ENABLED", "1") == "1"
+# Upper bound of a merged unit, and the longest pause that may be merged over
+RESEGMENT_MAX_DURATION = float(os.getenv("RESEGMENT_MAX_DURATION", "10"))
+RESEGMENT_MAX_GAP = float(os.getenv("RESEGMENT_MAX_GAP", "0.8"))
+# Segments shorter than this are merged even if they end a sentence
+RESEGMENT_MIN_DURATION = float(os.getenv("RESEGMENT_MIN_DURATION", "1.5"))
+# Part of the cache keys of everything that depends on the segmentation
+SEGMENTATION_KEY = (
+    f"merge-{RESEGMENT_MAX_DURATION:g}-{RESEGMENT_MAX_GAP:g}-{RESEGMENT_MIN_DURATION:g}"
+    if RESEGMENT_ENABLED else "whisper"
+)
+
+SENTENCE_ENDINGS = (".", "!", "?", "…", "。", "！", "？")
+
+
+def resegment(
+        segments: List[Dict],
+        max_duration: float = RESEGMENT_MAX_DURATION,
+        max_gap: float = RESEGMENT_MAX_GAP,
+        min_duration: float = RESEGMENT_MIN_DURATION,
+) -> List[Dict]:
+    """
+    Merge adjacent ASR segments into sentence-sized units
+
+    Segment bounds are first tightened to their word timestamps. A segment
+    is merged into the one before it when the pause between them is at most
+    `max_gap`, the merged unit stays within `max_duration`, and the one
+    before either doesn't end a sentence or is shorter than `min_duration`.
+    Every unit keeps the words (with their timestamps) of the segments it was
+    built from, and its speech is fitted to the whole unit; since only
+    pauses up to `max_gap` are merged over, the dub drifts at most that much
+    inside a unit. Each unit costs one translation, one TTS call and one
+    clip, so fewer units mean fewer external calls.
+    """
+    units: List[Dict] = []
+    for segment in segments:
+        segment = _word_bounds(segment)
+        if units and _can_merge(units[-1], segment, max_duration, max_gap, min_duration):
+            units[-1] = _join(units[-1], segment)
+        else:
+            units.append(segment)
+    return units
+
+
+def _word_bounds(segment: Dict) -> Dict:
+    """Segment with start/end from its first and last timed word"""
+    timed = [word for word in segment.get("words", []) if "start" in word and "end" in word]
+    start = timed[0]["start"] if timed else segment["start"]
+    end = timed[-1]["end"] if timed else segment["end"]
+    if end <= start:
+        start, end = segment["start"], segment["end"]
+    return {
+        "start": start,
+        "end": end,
+        "text": segment["text"].strip(),
+        "words": segment.get("words", []),
+    }
+
+
+def _can_merge(unit: Dict, segment: Dict, max_duration: float, max_gap: float, min_duration: float) -> bool:
+    if segment["start"] - unit["end"] > max_gap:
+        return False
+    if segment["end"] - unit["start"] > max_duration:
+        return False
+    ends_sentence = unit["text"].endswith(SENTENCE_ENDINGS)
+    return not ends_sentence or unit["end"] - unit["start"] < min_duration
+
+
+def _join(unit: Dict, segment: Dict) -> Dict:
+    return {
+        "start": unit["start"],
+        "end": max(unit["end"], segment["end"]),
+        "text": f"{unit['text']} {segment['text']}".strip(),
+        "words": unit["words"] + segment["words"],
+    }
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "./cache/results")
+# Bump whenever a change to the pipeline changes its outputs, so old entries are ignored
+PIPELINE_VERSION = "2"
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def transcript_key(transcription: dict) -> str:
+    """Fingerprint of a transcript's segments (timing and text); stages derived from it are keyed on it"""
+    return _key(*(f"{seg['start']:.3f}|{seg['end']:.3f}|{seg['text']}" for seg in transcription["text"]))
+
+
+class ResultCache:
+    """
+    Job and stage results keyed by the content hash of the upload
+
+    `get_result`/`put_result` cover a whole job (hash, target language,
+    voice); `get_stage`/`put_stage` hold intermediate artifacts such as the
+    transcript or the translations, so a re-run with only a different voice
+    skips ASR and translation. Entries are JSON files, written atomically.
+    """
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, output_dir: str = "./outputs"):
+        self.cache_dir = Path(cache_dir)
+        self.output_dir = Path(output_dir)
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.json"
+
+    def _read(self, path: Path) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, path: Path, data: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get_result(self, content_hash: str, target_language: str, voice: Optional[str]) -> Optional[dict]:
+        """Final `complete` payload of an identical earlier job, if its output still exists"""
+        path = self._path("jobs", _key(content_hash, target_language, voice or "", PIPELINE_VERSION))
+        result = self._read(path)
+        if result is None:
+            return None
+        if not (self.output_dir / result["translated_video"].lstrip("/")).exists():
+            path.unlink(missing_ok=True)
+            return None
+        return result
+
+    def put_result(self, content_hash: str, target_language: str, voice: Optional[str], result: dict):
+        self._write(self._path("jobs", _key(content_hash, target_language, voice or "", PIPELINE_VERSION)), result)
+
+    def get_stage(self, stage: str, *key_parts) -> Optional[dict]:
+        return self._read(self._path(stage, _key(*key_parts, PIPELINE_VERSION)))
+
+    def put_stage(self, stage: str, data: dict, *key_parts):
+        self._write(self._path(stage, _key(*key_parts, PIPELINE_VERSION)), data)
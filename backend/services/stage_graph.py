@@ -0,0 +1,111 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+
+# Items allowed to wait between two stages before the upstream stage is paused
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "8"))
+
+_DONE = object()
+
+
+class _Stage:
+    def __init__(self, name: str, func: Callable[[Any], Awaitable[Any]], workers: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+class _Failure:
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+class StageGraph:
+    """
+    Chain of async stages connected by bounded queues
+
+    Every item from the source flows through the stages in order; each stage
+    runs `workers` items at a time, so item N can be in a later stage while
+    item N+1 is still in an earlier one. A full queue pauses the stage
+    feeding it. `run` yields the final results in source order, as soon as
+    each result and all the ones before it are done.
+    """
+
+    def __init__(self, queue_size: int = STAGE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages: List[_Stage] = []
+
+    def add_stage(self, name: str, func: Callable[[Any], Awaitable[Any]], workers: int = 1) -> "StageGraph":
+        self.stages.append(_Stage(name, func, workers))
+        return self
+
+    async def run(self, source: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        if not self.stages:
+            raise Exception("StageGraph has no stages")
+
+        queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        # Unbounded: results only wait here until the ones before them are done
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.create_task(self._feed(source, queues[0], results))]
+        for i, stage in enumerate(self.stages):
+            output = queues[i + 1] if i + 1 < len(self.stages) else results
+            next_workers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                tasks.append(asyncio.create_task(
+                    self._work(stage, queues[i], output, results, remaining, next_workers)
+                ))
+
+        try:
+            pending = {}
+            next_index = 0
+            while True:
+                item = await results.get()
+                if isinstance(item, _Failure):
+                    raise item.error
+                if item is _DONE:
+                    break
+                index, value = item
+                pending[index] = value
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _feed(self, source: AsyncIterator[Any], output: asyncio.Queue, results: asyncio.Queue):
+        try:
+            index = 0
+            async for item in source:
+                await output.put((index, item))
+                index += 1
+            for _ in range(self.stages[0].workers):
+                await output.put(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            results.put_nowait(_Failure("source", e))
+
+    @staticmethod
+    async def _work(stage: _Stage, input_queue: asyncio.Queue, output: asyncio.Queue,
+                    results: asyncio.Queue, remaining: List[int], next_workers: int):
+        try:
+            while True:
+                item = await input_queue.get()
+                if item is _DONE:
+                    break
+                index, value = item
+                await output.put((index, await stage.func(value)))
+
+            # The last worker of the stage to finish tells every worker downstream
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                for _ in range(next_workers):
+                    await output.put(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            results.put_nowait(_Failure(stage.name, e))
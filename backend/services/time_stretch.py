@@ -0,0 +1,104 @@
+import numpy as np
+
+# Analysis window and search range for WSOLA, in seconds
+WSOLA_WINDOW = 0.03
+WSOLA_TOLERANCE = 0.01
+
+
+def time_stretch(samples: np.ndarray, sample_rate: int, target_frames: int) -> np.ndarray:
+    """
+    Stretch or compress PCM to exactly `target_frames` frames, keeping the pitch
+
+    Uses WSOLA (waveform similarity overlap-add): output frames are built
+    from Hann-windowed input windows taken at the stretched position,
+    shifted within a small tolerance to the offset that best continues the
+    previous window, so voiced speech does not get phasing artifacts.
+
+    Args:
+        samples: (frames, channels) int16 or float array
+        sample_rate: Sample rate of `samples`
+        target_frames: Exact number of output frames
+
+    Returns:
+        (target_frames, channels) array with the dtype of `samples`
+    """
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    channels = samples.shape[1]
+    if target_frames <= 0:
+        return np.zeros((0, channels), dtype=samples.dtype)
+    if len(samples) == 0:
+        return np.zeros((target_frames, channels), dtype=samples.dtype)
+
+    x = samples.astype(np.float32)
+    window_size = max(64, int(WSOLA_WINDOW * sample_rate))
+    hop = window_size // 2
+    tolerance = int(WSOLA_TOLERANCE * sample_rate)
+    speed = len(x) / target_frames
+
+    if len(x) < window_size:
+        return _fit(_resample_linear(x, target_frames), target_frames, samples.dtype)
+    if abs(speed - 1.0) < 1e-3:
+        return _fit(x, target_frames, samples.dtype)
+
+    window = np.hanning(window_size).astype(np.float32)[:, None]
+    # Pad so every window (plus search range) stays inside the input
+    x = np.concatenate([
+        np.zeros((tolerance, channels), np.float32),
+        x,
+        np.zeros((window_size + hop + 2 * tolerance, channels), np.float32),
+    ])
+    # Mono guide signal for the similarity search
+    guide = x.mean(axis=1)
+
+    out_len = target_frames + window_size
+    out = np.zeros((out_len, channels), np.float32)
+    norm = np.zeros((out_len, 1), np.float32)
+
+    prev_offset = tolerance
+    out_pos = 0
+    while out_pos < target_frames:
+        nominal = int(out_pos * speed) + tolerance
+        if out_pos == 0:
+            offset = nominal
+        else:
+            # Continue the previous window naturally: compare its next hop with candidates around nominal
+            natural = guide[prev_offset + hop:prev_offset + hop + window_size]
+            lo = max(0, nominal - tolerance)
+            region = guide[lo:nominal + tolerance + window_size]
+            offset = lo + _best_match(region, natural)
+
+        out[out_pos:out_pos + window_size] += x[offset:offset + window_size] * window
+        norm[out_pos:out_pos + window_size] += window
+        prev_offset = offset
+        out_pos += hop
+
+    out /= np.maximum(norm, 1e-3)
+    return _fit(out, target_frames, samples.dtype)
+
+
+def _best_match(region: np.ndarray, template: np.ndarray) -> int:
+    """Offset in `region` where `template` correlates best"""
+    count = len(region) - len(template) + 1
+    if count <= 1 or not template.any():
+        return max(0, count // 2)
+    corr = np.correlate(region, template, mode="valid")
+    return int(np.argmax(corr))
+
+
+def _resample_linear(x: np.ndarray, target_frames: int) -> np.ndarray:
+    """Plain linear resampling; only used for clips shorter than one window"""
+    positions = np.linspace(0, len(x) - 1, target_frames)
+    return np.stack([np.interp(positions, np.arange(len(x)), x[:, c]) for c in range(x.shape[1])], axis=1)
+
+
+def _fit(x: np.ndarray, target_frames: int, dtype) -> np.ndarray:
+    """Trim/zero-pad to exactly target_frames and convert back to the input dtype"""
+    if len(x) >= target_frames:
+        x = x[:target_frames]
+    else:
+        x = np.concatenate([x, np.zeros((target_frames - len(x), x.shape[1]), x.dtype)])
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        x = np.clip(np.round(x), info.min, info.max)
+    return x.astype(dtype)
@@ -1,46 +1,193 @@
+import os
+from bisect import bisect_right
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
 import whisperx
-import torch
+
+from .model_registry import ModelRegistry, model_registry
+from .vad import SpeechMap, iter_audio_windows, snap_to_speech
+
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "16"))
+WHISPER_SAMPLE_RATE = 16000
+# Silence between clips of a batch; at least WhisperX's 30s chunk so VAD never merges speech of two clips
+BATCH_CLIP_GAP = 30.0
+# Longer audio is transcribed window by window, split at pauses
+TRANSCRIPTION_WINDOW = float(os.getenv("TRANSCRIPTION_WINDOW", "60"))
+
 
 class TranscriptionService:
-    def __init__(self, device: str = "cuda" if torch.cuda.is_available() else "cpu"):
-        self.device = device
-        self.compute_type = "float16" if device == "cuda" else "int8"
+    def __init__(self, registry: ModelRegistry = model_registry, batch_size: int = WHISPER_BATCH_SIZE):
+        self.registry = registry
+        self.batch_size = batch_size
+        self.device = registry.device
+        self.compute_type = registry.compute_type
 
-    def transcribe_audio(self, audio_path: str, language: str = None) -> dict:
+    def transcribe_audio(self, audio_path: str, language: str = None, regions: list = None) -> dict:
         """
         Transcribe audio using WhisperX
 
         Args:
             audio_path: Path to audio file (NOT video!)
             language: Source language code (e.g., 'en', 'es') or None for auto-detect
+            regions: Speech regions (start, end) from VAD; only these are recognized
 
         Returns:
             dict with 'text' and 'segments' (timestamps)
         """
-        # Load WhisperX model
-        model = whisperx.load_model(
-            "base",
-            self.device,
-            compute_type=self.compute_type
-        )
+        # Shared WhisperX model (loaded once per process)
+        model = self.registry.get_asr_model()
+
+        # Decode once and reuse the samples for alignment
+        audio = whisperx.load_audio(audio_path)
+        speech_map = None
+        if regions:
+            speech_map = SpeechMap(regions)
+            audio = speech_map.pack(audio)
+
+        # Transcribe audio; the shared model reuses the last job's language unless told, so detect explicitly
+        with self.registry.inference_lock:
+            if language is None:
+                language = model.detect_language(audio)
+            result = model.transcribe(audio, batch_size=self.batch_size, language=language)
+
+        return self._restore(self._align(result.get("segments"), language, audio), speech_map)
+
+    def transcribe_batch(
+            self,
+            requests: List[Tuple[str, Optional[str], Optional[list]]],
+    ) -> List[Union[dict, Exception]]:
+        """
+        Transcribe several audio files with one batched WhisperX call per language
+
+        Clips of the same language are concatenated with BATCH_CLIP_GAP seconds
+        of silence and transcribed together, so their VAD chunks share the
+        faster-whisper batches. Segments are mapped back to their clip by
+        offset and aligned per clip.
+
+        Args:
+            requests: (audio_path, language, regions) triples; language None means
+                auto-detect, no regions (None or empty) means the whole clip is recognized
+
+        Returns:
+            One result per request, in order, in the format of transcribe_audio,
+            or the exception that request failed with
+        """
+        model = self.registry.get_asr_model()
+        results: List[Union[dict, Exception, None]] = [None] * len(requests)
+        audios = {}
+        speech_maps = {}
+        groups = {}
+
+        for i, (audio_path, language, regions) in enumerate(requests):
+            try:
+                audio = whisperx.load_audio(audio_path)
+                if regions:
+                    # Only the speech is recognized; silence and music are cut out
+                    speech_maps[i] = SpeechMap(regions)
+                    audio = speech_maps[i].pack(audio)
+                audios[i] = audio
+                if language is None:
+                    with self.registry.inference_lock:
+                        language = model.detect_language(audio)
+                groups.setdefault(language, []).append(i)
+            except Exception as e:
+                results[i] = e
+
+        gap = np.zeros(int(BATCH_CLIP_GAP * WHISPER_SAMPLE_RATE), dtype=np.float32)
+        for language, indices in groups.items():
+            pieces = []
+            offsets = []
+            position = 0
+            for i in indices:
+                if pieces:
+                    pieces.append(gap)
+                    position += len(gap)
+                offsets.append(position / WHISPER_SAMPLE_RATE)
+                pieces.append(audios[i])
+                position += len(audios[i])
+
+            try:
+                with self.registry.inference_lock:
+                    result = model.transcribe(np.concatenate(pieces), batch_size=self.batch_size, language=language)
+            except Exception as e:
+                for i in indices:
+                    results[i] = e
+                continue
+
+            clip_segments = {i: [] for i in indices}
+            for segment in result.get("segments"):
+                clip = max(bisect_right(offsets, segment["start"]) - 1, 0)
+                offset = offsets[clip]
+                clip_segments[indices[clip]].append({
+                    **segment,
+                    "start": segment["start"] - offset,
+                    "end": segment["end"] - offset,
+                })
+
+            for i in indices:
+                try:
+                    results[i] = self._restore(self._align(clip_segments[i], language, audios[i]), speech_maps.get(i))
+                except Exception as e:
+                    results[i] = e
+
+        return results
+
+    def transcribe_stream(
+            self,
+            audio_path: str,
+            language: str = None,
+            window: float = TRANSCRIPTION_WINDOW,
+            regions: list = None,
+    ) -> Iterator[Tuple[str, list, float]]:
+        """
+        Transcribe long audio incrementally, one pause-bounded window at a time
+
+        Only one window of samples is in memory at once. The language is
+        detected on the first window with speech and kept for the rest. With
+        VAD `regions`, only their speech is recognized and windows without
+        any are skipped.
+
+        Yields:
+            (language, aligned segments with absolute timestamps, seconds processed so far)
+        """
+        model = self.registry.get_asr_model()
+        for offset, audio in iter_audio_windows(audio_path, window):
+            position = offset + len(audio) / WHISPER_SAMPLE_RATE
+            speech_map = None
+            if regions:
+                # The window's part of the regions, relative to the window
+                local = [
+                    (max(start, offset) - offset, min(end, position) - offset)
+                    for start, end in regions if start < position and end > offset
+                ]
+                if not local:
+                    yield language, [], position
+                    continue
+                speech_map = SpeechMap(local)
+                audio = speech_map.pack(audio)
 
-        # Transcribe audio
-        result = model.transcribe(audio_path)
-        language = result.get('language')
+            # Windows of long videos interleave with the batches of other jobs
+            with self.registry.inference_lock:
+                if language is None:
+                    # The shared model would otherwise keep the previous job's language
+                    language = model.detect_language(audio)
+                result = model.transcribe(audio, batch_size=self.batch_size, language=language)
+            segments = self._restore(self._align(result.get("segments"), language, audio), speech_map)["text"]
+            yield language, [_shift_segment(segment, offset) for segment in segments], position
 
+    def _align(self, segments: list, language: str, audio) -> dict:
         # Align timestamps (optional but recommended)
-        model_a, metadata = whisperx.load_align_model(
-            language_code=language,
-            device=self.device
-        )
-
-        result = whisperx.align(
-            result.get("segments"),
-            model_a,
-            metadata,
-            audio_path,
-            self.device
-        )
+        model_a, metadata = self.registry.get_align_model(language)
+
+        with self.registry.inference_lock:
+            result = whisperx.align(
+                segments,
+                model_a,
+                metadata,
+                audio,
+                self.device
+            )
 
         return {
             "text": result.get("segments"),
@@ -48,8 +195,35 @@ class TranscriptionService:
             "full_text": " ".join([seg["text"] for seg in result["segments"]])
         }
 
+    @staticmethod
+    def _restore(transcription: dict, speech_map: Optional[SpeechMap]) -> dict:
+        """Map timestamps of packed speech back to the original audio and fit them to the speech"""
+        if speech_map is None:
+            return transcription
+        segments = [
+            snap_to_speech(_map_times(segment, speech_map.to_original), speech_map.regions)
+            for segment in transcription["text"]
+        ]
+        return {**transcription, "text": segments}
+
     def save_transcription(self, transcription: dict, output_path: str):
         """Save transcription to file"""
         import json
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(transcription, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            json.dump(transcription, f, ensure_ascii=False, indent=2)
+
+
+def _shift_segment(segment: dict, offset: float) -> dict:
+    """Move a segment (and its word timestamps) `offset` seconds later"""
+    return _map_times(segment, lambda t: t + offset)
+
+
+def _map_times(segment: dict, to_time: Callable[[float], float]) -> dict:
+    """Apply `to_time` to a segment's start/end and those of its words"""
+    mapped = dict(segment)
+    for key in ("start", "end"):
+        if key in mapped:
+            mapped[key] = to_time(mapped[key])
+    if "words" in mapped:
+        mapped["words"] = [_map_times(word, to_time) for word in mapped["words"]]
+    return mapped
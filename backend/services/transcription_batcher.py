@@ -0,0 +1,88 @@
+import asyncio
+import os
+from typing import Optional
+
+from .transcription import TranscriptionService
+
+# How long to wait for more jobs before running a batch, and how many clips a batch may hold
+TRANSCRIPTION_BATCH_WINDOW = float(os.getenv("TRANSCRIPTION_BATCH_WINDOW", "0.5"))
+TRANSCRIPTION_MAX_BATCH = int(os.getenv("TRANSCRIPTION_MAX_BATCH", "8"))
+
+
+class TranscriptionBatcher:
+    """
+    Collects transcription requests of concurrent jobs into batched ASR calls
+
+    Requests arriving within `window` seconds of the first one (up to
+    `max_batch`) are transcribed together by TranscriptionService.transcribe_batch
+    and each caller gets its own result back. Batches run one at a time on a
+    worker thread; ModelRegistry.inference_lock also keeps them apart from
+    the windowed transcription of long videos.
+    """
+
+    def __init__(
+            self,
+            transcription_service: TranscriptionService = None,
+            window: float = TRANSCRIPTION_BATCH_WINDOW,
+            max_batch: int = TRANSCRIPTION_MAX_BATCH,
+    ):
+        self.transcription_service = transcription_service or TranscriptionService()
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def transcribe(self, audio_path: str, language: str = None, regions: list = None) -> dict:
+        # Created lazily: the batcher has to live on the loop that uses it
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio_path, language, regions, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Jobs cancelled while waiting don't need transcribing
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                continue
+
+            print(f"Transcribing a batch of {len(batch)} clips")
+            try:
+                results = await asyncio.to_thread(
+                    self.transcription_service.transcribe_batch,
+                    [(audio_path, language, regions) for audio_path, language, regions, _ in batch]
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (*_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
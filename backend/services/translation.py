@@ -1,26 +1,170 @@
-import httpx  # Use httpx for async HTTP requests
-from typing import List, Dict
+import asyncio
+import os
+import time
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+from .metrics import track_call
+from .translation_backends import (
+    RetryableTranslationError,
+    TranslationBackend,
+    TRANSLATION_CONCURRENCY,
+    create_backend,
+    parse_backend_overrides,
+)
+from .translation_cache import TranslationCache
+
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "mymemory")
+# Per language pair overrides, e.g. "en|de=deepl,en|fr=deepl"
+TRANSLATION_BACKEND_OVERRIDES = os.getenv("TRANSLATION_BACKEND_OVERRIDES", "")
+# Requests per second to the provider, for the whole service: each of the
+# JOB_WORKERS worker processes enforces its share (see WorkerPool)
+TRANSLATION_RATE_LIMIT = float(os.getenv("TRANSLATION_RATE_LIMIT", "10"))
+TRANSLATION_BURST = int(os.getenv("TRANSLATION_BURST", "10"))
+TRANSLATION_MAX_RETRIES = int(os.getenv("TRANSLATION_MAX_RETRIES", "3"))
+TRANSLATION_BACKOFF = float(os.getenv("TRANSLATION_BACKOFF", "0.5"))  # seconds, doubled per retry
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "1") == "1"
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `capacity` stored"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
 
 class TranslationService:
-    def __init__(self):
-        self.translation_api_url = "https://api.mymemory.translated.net/get"  # Correct endpoint
+    def __init__(
+            self,
+            backend: str = TRANSLATION_BACKEND,
+            backend_overrides: Optional[Dict[str, str]] = None,
+            concurrency: int = TRANSLATION_CONCURRENCY,
+            rate_limit: float = TRANSLATION_RATE_LIMIT,
+            burst: int = TRANSLATION_BURST,
+            max_retries: int = TRANSLATION_MAX_RETRIES,
+            cache: Optional[TranslationCache] = None,
+    ):
+        self.default_backend = backend
+        self.backend_overrides = (
+            parse_backend_overrides(TRANSLATION_BACKEND_OVERRIDES) if backend_overrides is None else backend_overrides
+        )
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._backends: Dict[str, TranslationBackend] = {}
+        self._bucket = TokenBucket(rate_limit, burst)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        if cache is None and TRANSLATION_CACHE_ENABLED:
+            cache = TranslationCache()
+        self.cache = cache
+
+    def get_backend(self, source_lang: str, target_lang: str) -> TranslationBackend:
+        """Backend for a language pair; instances are created once and reused"""
+        name = self.backend_overrides.get(f"{source_lang}|{target_lang}", self.default_backend)
+        if name not in self._backends:
+            self._backends[name] = create_backend(name)
+        return self._backends[name]
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the loop that actually runs the jobs
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def aclose(self):
+        for backend in self._backends.values():
+            await backend.aclose()
+        self._backends.clear()
 
     async def translate_text(self, text: str, source_lang: str = "en", target_lang: str = "ru") -> str:
-        params = {
-            "q": text,
-            "langpair": f"{source_lang}|{target_lang}",
-        }
+        translations = [translation async for _, translation in self.translate_many([text], source_lang, target_lang)]
+        return translations[0]
+
+    async def _translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """One provider request, with rate limiting and retries, stored in the cache on success"""
+        backend = self.get_backend(source_lang, target_lang)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    await self._bucket.acquire()
+                    with track_call("translation", backend.name):
+                        translations = await backend.translate_batch(texts, source_lang, target_lang)
+                break
+            except RetryableTranslationError as e:
+                if attempt == self.max_retries:
+                    raise Exception(f"Translation error: {e}")
+                await asyncio.sleep(TRANSLATION_BACKOFF * (2 ** attempt))
+
+        if len(translations) != len(texts):
+            raise Exception(f"Translation error: {backend.name} returned {len(translations)} results for {len(texts)} texts")
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, texts, translations, f"{source_lang}|{target_lang}")
+        return translations
+
+    async def translate_many(
+            self,
+            texts: List[str],
+            source_lang: str = "en",
+            target_lang: str = "ru",
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Translate texts concurrently (bounded by the concurrency limit and rate limit)
+
+        Yields (index, translation) strictly in input order, as soon as each
+        translation and all the ones before it are done. The cache is
+        consulted for the whole list up front, so a fully cached video makes
+        no network calls; the misses are sent in batches as large as the
+        backend supports.
+        """
+        langpair = f"{source_lang}|{target_lang}"
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get_many, texts, langpair)
+        else:
+            cached = [None] * len(texts)
+
+        misses = [idx for idx, hit in enumerate(cached) if hit is None]
+        batch_size = max(1, self.get_backend(source_lang, target_lang).max_batch_size)
+
+        # index -> (task translating its batch, position inside the batch)
+        pending: Dict[int, Tuple[asyncio.Task, int]] = {}
+        tasks = []
+        for start in range(0, len(misses), batch_size):
+            batch = misses[start:start + batch_size]
+            task = asyncio.create_task(
+                self._translate_batch([texts[idx] for idx in batch], source_lang, target_lang)
+            )
+            tasks.append(task)
+            for position, idx in enumerate(batch):
+                pending[idx] = (task, position)
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.translation_api_url, params=params)
-                return response.json()["matches"][0]["translation"]
-        except httpx.HTTPError as e:
-            raise Exception(f"HTTP error occurred: {e}")
-        except KeyError as e:
-            raise Exception(f"Unexpected response format: {e}. Response: {result}")
-        except Exception as e:
-            raise Exception(f"Translation error: {e}")
+            for idx in range(len(texts)):
+                if idx in pending:
+                    task, position = pending[idx]
+                    yield idx, (await task)[position]
+                else:
+                    yield idx, cached[idx]
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def translate_segments(
             self,
@@ -39,18 +183,16 @@ class TranslationService:
         """
         translated_segments = []
 
-        for segment in segments:
-            # Use await since translate_with_openai is async
-            translated_text = await self.translate_text(
-                segment["text"],
+        async for idx, translated_text in self.translate_many(
+                [segment["text"] for segment in segments],
                 "en",
                 target_language
-            )
-
+        ):
+            segment = segments[idx]
             translated_segments.append({
                 **segment,
                 "original_text": segment["text"],
                 "translated_text": translated_text
             })
 
-        return translated_segments
\ No newline at end of file
+        return translated_segments
@@ -0,0 +1,175 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+import httpx
+
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "8"))
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "15"))
+DEEPL_AUTH_KEY = os.getenv("DEEPL_AUTH_KEY", "")
+DEEPL_BATCH_SIZE = int(os.getenv("DEEPL_BATCH_SIZE", "50"))
+FAKE_TRANSLATION_LATENCY = float(os.getenv("FAKE_TRANSLATION_LATENCY", "0"))
+# Overridable so benchmarks can point the backend at a local stub
+MYMEMORY_API_URL = os.getenv("MYMEMORY_API_URL", "https://api.mymemory.translated.net/get")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableTranslationError(Exception):
+    """Transient provider failure (rate limit, 5xx, network); the request can be retried"""
+    pass
+
+
+class TranslationBackend:
+    """
+    Interface of a translation provider
+
+    `translate_batch` translates up to `max_batch_size` texts in a single
+    provider request and returns the translations in input order.
+    """
+
+    name = "base"
+    max_batch_size = 1
+
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class MyMemoryBackend(TranslationBackend):
+    """MyMemory GET API, one sentence per request"""
+
+    name = "mymemory"
+    max_batch_size = 1
+
+    def __init__(self, max_connections: int = TRANSLATION_CONCURRENCY, api_url: str = MYMEMORY_API_URL):
+        self.translation_api_url = api_url
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """One pooled client for the lifetime of the backend (keeps TLS connections alive)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=TRANSLATION_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return [await self._translate_one(text, source_lang, target_lang) for text in texts]
+
+    async def _translate_one(self, text: str, source_lang: str, target_lang: str) -> str:
+        params = {
+            "q": text,
+            "langpair": f"{source_lang}|{target_lang}",
+        }
+
+        try:
+            response = await self.client.get(self.translation_api_url, params=params)
+        except httpx.TransportError as e:
+            raise RetryableTranslationError(f"HTTP error occurred: {e}")
+        except httpx.HTTPError as e:
+            raise Exception(f"HTTP error occurred: {e}")
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableTranslationError(f"HTTP {response.status_code}")
+
+        try:
+            result = response.json()
+        except ValueError as e:
+            raise Exception(f"Unexpected response format: {e}. Response: {response.text}")
+
+        # MyMemory reports quota/backend problems in the body with a 200 response
+        if result.get("responseStatus") in RETRYABLE_STATUS_CODES:
+            raise RetryableTranslationError(result.get("responseDetails", "Rate limited"))
+
+        try:
+            return result["matches"][0]["translation"]
+        except (KeyError, IndexError) as e:
+            raise Exception(f"Unexpected response format: {e}. Response: {result}")
+
+
+class DeepLBackend(TranslationBackend):
+    """DeepL API via the official client, many texts per request"""
+
+    name = "deepl"
+
+    # DeepL wants a regional variant for these target languages
+    TARGET_VARIANTS = {"en": "EN-US", "pt": "PT-BR"}
+
+    def __init__(self, auth_key: str = DEEPL_AUTH_KEY, batch_size: int = DEEPL_BATCH_SIZE):
+        import deepl
+
+        if not auth_key:
+            raise Exception("DEEPL_AUTH_KEY is not set")
+        self._deepl = deepl
+        self.translator = deepl.Translator(auth_key)
+        self.max_batch_size = batch_size
+
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        target = self.TARGET_VARIANTS.get(target_lang.lower(), target_lang.upper())
+        try:
+            # The client is synchronous; keep it off the event loop
+            results = await asyncio.to_thread(
+                self.translator.translate_text,
+                texts,
+                source_lang=source_lang.upper() if source_lang else None,
+                target_lang=target,
+            )
+        except (self._deepl.exceptions.TooManyRequestsException, self._deepl.exceptions.ConnectionException) as e:
+            raise RetryableTranslationError(str(e))
+        except self._deepl.exceptions.DeepLException as e:
+            raise Exception(f"DeepL error: {e}")
+        return [result.text for result in results]
+
+
+class FakeBackend(TranslationBackend):
+    """Local stand-in for tests and benchmarks: tags the text with the target language"""
+
+    name = "fake"
+    max_batch_size = 100
+
+    def __init__(self, latency: float = FAKE_TRANSLATION_LATENCY):
+        self.latency = latency
+        self.requests = 0
+
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [f"[{target_lang}] {text.strip()}" for text in texts]
+
+
+BACKENDS = {
+    MyMemoryBackend.name: MyMemoryBackend,
+    DeepLBackend.name: DeepLBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def create_backend(name: str, **kwargs) -> TranslationBackend:
+    if name not in BACKENDS:
+        raise Exception(f"Unknown translation backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def parse_backend_overrides(value: str) -> Dict[str, str]:
+    """Parse 'en|de=deepl,en|hy=mymemory' into {langpair: backend name}"""
+    overrides = {}
+    for item in value.split(","):
+        if "=" in item:
+            langpair, name = item.split("=", 1)
+            overrides[langpair.strip()] = name.strip()
+    return overrides
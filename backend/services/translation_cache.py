@@ -0,0 +1,150 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "./cache/translations.db")
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "200000"))
+
+# Run eviction after this many writes instead of on every insert
+EVICT_EVERY_WRITES = 200
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-transcribed segments with different spacing share an entry"""
+    return " ".join(text.split())
+
+
+def cache_key(text: str, langpair: str) -> str:
+    return hashlib.sha256(f"{langpair}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Translation memory stored in SQLite, keyed by normalized source text + langpair
+
+    Entries expire after `ttl` seconds; when the table grows past
+    `max_entries` the least recently used rows are dropped.
+    """
+
+    def __init__(
+            self,
+            db_path: str = TRANSLATION_CACHE_PATH,
+            ttl: float = TRANSLATION_CACHE_TTL,
+            max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    key TEXT PRIMARY KEY,
+                    langpair TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, text: str, langpair: str) -> Optional[str]:
+        return self.get_many([text], langpair)[0]
+
+    def get_many(self, texts: List[str], langpair: str) -> List[Optional[str]]:
+        """Look up a whole segment list at once; returns None for every miss"""
+        keys = [cache_key(text, langpair) for text in texts]
+        found: Dict[str, str] = {}
+        now = time.time()
+
+        with self._connect() as conn:
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+                chunk = unique_keys[i:i + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, translation FROM translations "
+                    f"WHERE key IN ({placeholders}) AND created_at > ?",
+                    (*chunk, now - self.ttl)
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                conn.executemany(
+                    "UPDATE translations SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for result in results if result is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put(self, text: str, langpair: str, translation: str):
+        self.put_many([text], [translation], langpair)
+
+    def put_many(self, texts: List[str], translations: List[str], langpair: str):
+        now = time.time()
+        rows = [
+            (cache_key(text, langpair), langpair, normalize_text(text), translation, now, now)
+            for text, translation in zip(texts, translations)
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(key, langpair, source_text, translation, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+        with self._lock:
+            self._writes += len(rows)
+            should_evict = self._writes >= EVICT_EVERY_WRITES
+            if should_evict:
+                self._writes = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones above max_entries"""
+        with self._connect() as conn:
+            removed = conn.execute(
+                "DELETE FROM translations WHERE created_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+            count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+        return removed
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
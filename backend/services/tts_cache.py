@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Tuple
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "./cache/tts")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "1024"))
+# edge-tts default output format; part of the key so a format change never serves stale audio
+TTS_OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+# Run eviction after this many writes instead of on every insert (a few MB of overshoot at most)
+EVICT_EVERY_WRITES = 200
+
+
+def tts_cache_key(text: str, voice: str, rate: str = "+0%", output_format: str = TTS_OUTPUT_FORMAT) -> str:
+    return hashlib.sha256(f"{voice}\0{rate}\0{output_format}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized speech
+
+    Audio lives in `<cache_dir>/<ab>/<key><suffix>` (`.mp3` for edge-tts,
+    one cache directory per audio format); an SQLite index next to it
+    keeps the size, duration and last access of every clip, so the speed
+    factor can be computed without decoding and the least recently used
+    clips can be evicted once the cache exceeds `max_mb`.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_mb: int = TTS_CACHE_MAX_MB, suffix: str = ".mp3"):
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(self.cache_dir / "index.db")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clips (
+                    key TEXT PRIMARY KEY,
+                    voice TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    duration REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS clips_accessed ON clips (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def clip_path(self, key: str) -> Path:
+        """Location of a clip's audio file (which may or may not exist)"""
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (audio bytes, duration) for a cached clip, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT duration FROM clips WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                try:
+                    data = self.clip_path(key).read_bytes()
+                except FileNotFoundError:
+                    # Index and files drifted apart (e.g. manual cleanup)
+                    conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+                    row = None
+                else:
+                    conn.execute("UPDATE clips SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return data, row[0]
+
+    def put(self, key: str, data: bytes, duration: float, voice: str = ""):
+        path = self.clip_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so readers never see a partial clip
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO clips (key, voice, size, duration, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, voice, len(data), duration, now, now)
+            )
+
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes >= EVICT_EVERY_WRITES
+            if should_evict:
+                self._writes = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used clips until the cache fits in max_bytes"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            rows = conn.execute("SELECT key, size FROM clips ORDER BY accessed_at").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.clip_path(key).unlink(missing_ok=True)
+                conn.execute("DELETE FROM clips WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM clips").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 1),
+        }
@@ -1,95 +1,199 @@
 import asyncio
-import subprocess
+import io
+import os
+import wave
+import zlib
 from pathlib import Path
-from pydub import AudioSegment
+from typing import Dict, Optional, Tuple
+
+import edge_tts
+import numpy as np
+
+from .audio_timeline import AudioTimeline, decode_audio
+from .metrics import track_call
+from .time_stretch import time_stretch
+from .tts_cache import TTSCache, TTS_CACHE_DIR, tts_cache_key
+
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "6"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "2"))
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+# "edge" (Microsoft Edge TTS) or "tone" (offline tone synthesizer for benchmarks)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "edge")
+TONE_SECONDS_PER_CHAR = float(os.getenv("TONE_SECONDS_PER_CHAR", "0.06"))
+TTS_SAMPLE_RATE = 44100
+TTS_CHANNELS = 2
+# File suffix of the audio each backend returns
+BACKEND_SUFFIXES = {"edge": ".mp3", "tone": ".wav"}
 
 class TTSService:
-    async def generate_perfectly_synced_audio(self, segments, output_path: str, voice: str = "en-US-AriaNeural"):
-        print(f"Generating {output_path} {voice}")
-        combined = AudioSegment.silent(duration=0)
-
-        for i, seg in enumerate(segments):
-            text = seg["translated_text"].strip()
-            if not text:
-                silence = AudioSegment.silent(duration=int(seg["duration"] * 1000))
-                combined += silence
-                continue
-
-            # 1. Generate normal-speed TTS
-            raw_path = f"./temp/tts_raw_{i}.mp3"
-            await self._edge_tts(text, voice, raw_path)
-
-            tts_audio = AudioSegment.from_file(raw_path)
-            tts_duration = len(tts_audio) / 1000.0
-            target_duration = seg["duration"]
-
-            # 2. Calculate speed factor
-            if tts_duration < 0.05:  # too short, probably empty
-                continue
-
-            speed = tts_duration / target_duration
-
-            # 3. Apply speed change with ffmpeg atempo (preserves pitch)
-            adjusted_path = f"./temp/tts_adj_{i}.wav"
-            self._apply_atempo_speed(raw_path, adjusted_path, speed)
-
-            adjusted = AudioSegment.from_file(adjusted_path)
-
-            # 4. Trim/pad to exact target duration (fixes tiny rounding errors)
-            target_ms = int(target_duration * 1000)
-            if len(adjusted) > target_ms:
-                adjusted = adjusted[:target_ms]
+    def __init__(
+            self,
+            concurrency: int = TTS_CONCURRENCY,
+            max_retries: int = TTS_MAX_RETRIES,
+            cache: Optional[TTSCache] = None,
+            backend: str = TTS_BACKEND,
+    ):
+        if backend not in BACKEND_SUFFIXES:
+            raise Exception(f"Unknown TTS backend: {backend}")
+        self.backend = backend
+        # Clips are stored under the extension of what the backend actually returns
+        self.suffix = BACKEND_SUFFIXES[backend]
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        if cache is None and TTS_CACHE_ENABLED:
+            if backend == "edge":
+                cache = TTSCache()
             else:
-                adjusted += AudioSegment.silent(duration=target_ms - len(adjusted))
-
-            # 5. Add silence gap before this segment (if any)
-            if i == 0:
-                silence_before = seg["start"]
-            else:
-                silence_before = seg["start"] - segments[i-1]["end"]
-
-            if silence_before > 0.02:
-                combined += AudioSegment.silent(duration=int(silence_before * 1000))
-
-            combined += adjusted
-
-            # Cleanup
-            Path(raw_path).unlink(missing_ok=True)
-            Path(adjusted_path).unlink(missing_ok=True)
+                cache = TTSCache(cache_dir=str(Path(TTS_CACHE_DIR) / backend), suffix=self.suffix)
+        self.cache = cache
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the loop that actually runs the jobs
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def new_timeline(segments, total_duration: float = None) -> AudioTimeline:
+        # One preallocated track; gaps and empty segments are simply left as silence
+        last_end = max((seg["end"] for seg in segments), default=0.0)
+        return AudioTimeline(
+            max(total_duration or 0.0, last_end),
+            sample_rate=TTS_SAMPLE_RATE,
+            channels=TTS_CHANNELS,
+        )
 
-        # Export final perfectly synced audio
-        combined.export(output_path, format="wav")
+    async def render_segment(self, seg: Dict, voice: str) -> Optional[np.ndarray]:
+        """
+        Synthesize one segment and stretch it to the segment length
+
+        Returns the PCM samples to place at seg["start"], or None if the
+        segment has no speech.
+        """
+        text = seg["translated_text"].strip()
+        if not text:
+            return None
+
+        # 1. Generate normal-speed TTS
+        audio, tts_duration = await self.synthesize_clip(text, voice)
+        target_duration = seg["duration"]
+        if tts_duration < 0.05 or target_duration <= 0:  # too short, probably empty
+            return None
+
+        # 2. Stretch/compress in-process to the segment length (preserves pitch)
+        return await asyncio.to_thread(self._fit_to_duration, audio, target_duration)
+
+    async def prepare_clip(self, seg: Dict, voice: str, clip_path: Path) -> Optional[Dict]:
+        """
+        Synthesize one segment into `clip_path` (which should end in `self.suffix`)
+
+        Returns the clip with the audio file `path`, the segment `start` and
+        `duration` in seconds, and the `tempo` factor that makes the speech
+        fit the segment; None if the segment has no speech.
+        """
+        text = seg["translated_text"].strip()
+        if not text:
+            return None
+
+        audio, tts_duration = await self.synthesize_clip(text, voice)
+        target_duration = seg["duration"]
+        if tts_duration < 0.05 or target_duration <= 0:  # too short, probably empty
+            return None
+
+        await asyncio.to_thread(self._materialize_clip, text, voice, audio, Path(clip_path))
+        return {
+            "path": str(clip_path),
+            "start": seg["start"],
+            "duration": target_duration,
+            "tempo": tts_duration / target_duration,
+        }
 
-    async def _edge_tts(self, text: str, voice: str, output_path: str):
-        proc = await asyncio.create_subprocess_exec(
-            "edge-tts",
-            "--voice", voice,
-            "--text", text,
-            "--write-media", output_path,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
-
-    def _apply_atempo_speed(self, input_path: str, output_path: str, speed: float):
-        # Build safe atempo chain (atempo only allows 0.5–2.0)
-        filters = []
-        current = speed
-        while current > 1.95:
-            filters.append("atempo=2.0")
-            current /= 2.0
-        while current < 0.51:
-            filters.append("atempo=0.5")
-            current /= 0.5
-        filters.append(f"atempo={current:.6f}")
-        filter_str = ",".join(filters)
-
-        subprocess.run([
-            "ffmpeg", "-y", "-i", input_path,
-            "-filter:a", filter_str,
-            "-ar", "44100", "-ac", "2",  # ensure good quality
-            output_path
-        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    def _materialize_clip(self, text: str, voice: str, audio: bytes, clip_path: Path):
+        # Hard-link the cached file when possible (no copy, and immune to later cache eviction)
+        if self.cache is not None:
+            try:
+                os.link(self.cache.clip_path(self._cache_key(text, voice)), clip_path)
+                return
+            except OSError:
+                pass
+        clip_path.write_bytes(audio)
+
+    async def synthesize_clip(self, text: str, voice: str) -> Tuple[bytes, float]:
+        """Return (audio bytes, duration in seconds), served from the TTS cache when possible"""
+        key = self._cache_key(text, voice)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        data = await self.synthesize(text, voice)
+        duration = await asyncio.to_thread(self.audio_duration, data)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, data, duration, voice)
+        return data, duration
+
+    def _cache_key(self, text: str, voice: str) -> str:
+        # Keep clips of other backends apart from the real voices
+        return tts_cache_key(text, voice if self.backend == "edge" else f"{self.backend}:{voice}")
+
+    @staticmethod
+    def audio_duration(data: bytes) -> float:
+        return len(decode_audio(data, TTS_SAMPLE_RATE, 1)) / TTS_SAMPLE_RATE
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """Synthesize text in-process and return the encoded audio (format per backend, see BACKEND_SUFFIXES)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    with track_call(f"{self.backend}_tts", "synthesize"):
+                        if self.backend == "tone":
+                            return await asyncio.to_thread(self._tone, text, voice)
+                        return await self._edge_tts(text, voice)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise Exception(f"TTS error ({voice}): {e}")
+                await asyncio.sleep(0.5 * (2 ** attempt))
+
+    async def _edge_tts(self, text: str, voice: str) -> bytes:
+        communicate = edge_tts.Communicate(text, voice)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+
+        if not audio:
+            raise Exception("no audio received")
+        return bytes(audio)
+
+    @staticmethod
+    def _tone(text: str, voice: str) -> bytes:
+        """
+        Offline stand-in for a TTS voice: a WAV tone with a little noise
+
+        The length follows the text (TONE_SECONDS_PER_CHAR) and the pitch
+        the voice, so clips behave like speech for timing purposes.
+        """
+        seed = zlib.crc32(f"{voice}|{text}".encode("utf-8"))
+        duration = max(0.3, len(text) * TONE_SECONDS_PER_CHAR)
+        t = np.arange(int(duration * TTS_SAMPLE_RATE)) / TTS_SAMPLE_RATE
+        frequency = 120 + zlib.crc32(voice.encode("utf-8")) % 180
+        noise = np.random.default_rng(seed).standard_normal(len(t))
+        samples = 0.3 * np.sin(2 * np.pi * frequency * t) + 0.02 * noise
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(TTS_SAMPLE_RATE)
+            wav.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+        return buffer.getvalue()
+
+    def _fit_to_duration(self, audio: bytes, target_duration: float) -> np.ndarray:
+        """Decode a clip and time-stretch it (pitch preserved) to exactly target_duration"""
+        pcm = decode_audio(audio, TTS_SAMPLE_RATE, TTS_CHANNELS)
+        return time_stretch(pcm, TTS_SAMPLE_RATE, int(round(target_duration * TTS_SAMPLE_RATE)))
 
     def get_voice_for_language(self, lang: str) -> str:
         voices = {
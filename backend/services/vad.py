@@ -0,0 +1,233 @@
+import os
+import wave
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_SECONDS = 0.03
+# Energy-based pre-pass that restricts ASR to speech
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+# Speech detection: frames this far above the noise floor are speech
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_FLOOR_DB = -70.0
+VAD_MIN_SILENCE = float(os.getenv("VAD_MIN_SILENCE", "0.5"))
+VAD_MIN_SPEECH = float(os.getenv("VAD_MIN_SPEECH", "0.15"))
+VAD_PADDING = float(os.getenv("VAD_PADDING", "0.2"))
+# Silence kept between speech regions when they are packed for ASR
+VAD_PACK_GAP = float(os.getenv("VAD_PACK_GAP", "0.5"))
+# Below this share of the audio the detection is not trusted (e.g. speech over
+# music has no quiet floor to compare with) and ASR gets the whole file
+VAD_MIN_COVERAGE = float(os.getenv("VAD_MIN_COVERAGE", "0.1"))
+# Part of the cache keys of transcripts (which depend on the detection)
+VAD_KEY = (
+    f"energy-{VAD_MARGIN_DB:g}-{VAD_MIN_SILENCE:g}-{VAD_MIN_SPEECH:g}-{VAD_PADDING:g}-{VAD_PACK_GAP:g}-{VAD_MIN_COVERAGE:g}"
+    if VAD_ENABLED else "off"
+)
+
+
+def frame_energy(audio: np.ndarray, sample_rate: int = VAD_SAMPLE_RATE, frame_seconds: float = VAD_FRAME_SECONDS) -> np.ndarray:
+    """RMS energy in dBFS of consecutive fixed-size frames of float audio"""
+    frame = max(1, int(frame_seconds * sample_rate))
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+
+def quietest_point(
+        audio: np.ndarray,
+        search_from: int,
+        sample_rate: int = VAD_SAMPLE_RATE,
+        min_silence: float = 0.3,
+) -> int:
+    """
+    Sample index of the quietest stretch of `audio` after `search_from`
+
+    Energy is averaged over `min_silence` seconds, so a real pause wins over
+    a single quiet frame inside a word. Returns len(audio) if there is
+    nothing to search.
+    """
+    frame = max(1, int(VAD_FRAME_SECONDS * sample_rate))
+    energy = frame_energy(audio, sample_rate)
+    first = search_from // frame
+    if first >= len(energy):
+        return len(audio)
+
+    span = max(1, int(min_silence / VAD_FRAME_SECONDS))
+    smoothed = np.convolve(energy, np.ones(span) / span, mode="same")
+    best = first + int(np.argmin(smoothed[first:]))
+    return best * frame + frame // 2
+
+
+def iter_audio_windows(
+        audio_path: str,
+        max_window: float,
+        min_window: float = None,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Read a 16 kHz mono 16-bit WAV in windows of at most `max_window` seconds
+
+    Each window ends at the quietest point after `min_window` seconds (half
+    the window by default), so cuts fall into pauses rather than words. Only
+    one window is held in memory at a time.
+
+    Yields:
+        (offset in seconds, float32 samples) per window
+    """
+    min_window = max_window / 2 if min_window is None else min_window
+    max_samples = int(max_window * VAD_SAMPLE_RATE)
+    min_samples = int(min_window * VAD_SAMPLE_RATE)
+
+    with wave.open(audio_path, "rb") as wav:
+        if wav.getframerate() != VAD_SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise Exception(f"Expected 16 kHz mono 16-bit audio: {audio_path}")
+
+        buffer = np.zeros(0, dtype=np.float32)
+        offset = 0
+        while True:
+            frames = wav.readframes(max_samples - len(buffer))
+            chunk = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+            buffer = np.concatenate([buffer, chunk])
+
+            if len(buffer) < max_samples:
+                # End of file
+                if len(buffer):
+                    yield offset / VAD_SAMPLE_RATE, buffer
+                return
+
+            cut = quietest_point(buffer, min_samples)
+            yield offset / VAD_SAMPLE_RATE, buffer[:cut]
+            buffer = buffer[cut:]
+            offset += cut
+
+
+def detect_speech(
+        energy: np.ndarray,
+        frame_seconds: float = VAD_FRAME_SECONDS,
+        margin_db: float = VAD_MARGIN_DB,
+        min_silence: float = VAD_MIN_SILENCE,
+        min_speech: float = VAD_MIN_SPEECH,
+        padding: float = VAD_PADDING,
+) -> List[Tuple[float, float]]:
+    """
+    Speech regions (start, end) in seconds from per-frame energy in dBFS
+
+    A frame is speech when it is `margin_db` above the noise floor (a low
+    percentile of the energy, never below VAD_FLOOR_DB). Pauses shorter
+    than `min_silence` are bridged, bursts shorter than `min_speech` are
+    dropped and every region is widened by `padding` on both sides.
+    """
+    if len(energy) == 0:
+        return []
+    floor = max(float(np.percentile(energy, 10)), VAD_FLOOR_DB)
+    active = energy > floor + margin_db
+
+    # Rising/falling edges of the active mask
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], active.astype(np.int8), [0]])))
+    total = len(energy) * frame_seconds
+    regions: List[List[float]] = []
+    for first, last in zip(edges[::2], edges[1::2]):
+        start, end = float(first * frame_seconds), float(last * frame_seconds)
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    padded: List[Tuple[float, float]] = []
+    for start, end in regions:
+        if end - start < min_speech:
+            continue
+        start, end = max(0.0, start - padding), min(total, end + padding)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return padded
+
+
+def file_speech_regions(
+        audio_path: str,
+        block_seconds: float = 60.0,
+        min_coverage: float = VAD_MIN_COVERAGE,
+) -> Optional[List[Tuple[float, float]]]:
+    """
+    Speech regions (start, end) in seconds of a 16 kHz mono 16-bit WAV
+
+    The file is read block by block; only the per-frame energy (a few
+    hundred bytes per minute) is kept for the whole file. Returns None when
+    the regions cover less than `min_coverage` of the audio: an energy
+    threshold can't tell speech apart in audio with a constant level, and
+    the caller should then recognize the whole file.
+    """
+    frame = int(VAD_FRAME_SECONDS * VAD_SAMPLE_RATE)
+    block = int(block_seconds / VAD_FRAME_SECONDS) * frame
+    energies = []
+    with wave.open(audio_path, "rb") as wav:
+        if wav.getframerate() != VAD_SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise Exception(f"Expected 16 kHz mono 16-bit audio: {audio_path}")
+        while True:
+            frames = wav.readframes(block)
+            if not frames:
+                break
+            energies.append(frame_energy(np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0))
+    energy = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    regions = detect_speech(energy)
+    total = len(energy) * VAD_FRAME_SECONDS
+    if total == 0 or sum(end - start for start, end in regions) < min_coverage * total:
+        return None
+    return regions
+
+
+class SpeechMap:
+    """
+    Packs the speech regions of some audio back to back for ASR
+
+    Silence between regions is cut down to `gap` seconds (enough for the
+    recognizer to see a pause), and `to_original` maps a time in the
+    packed audio back to the original timeline.
+    """
+
+    def __init__(self, regions: List[Tuple[float, float]], gap: float = VAD_PACK_GAP, sample_rate: int = VAD_SAMPLE_RATE):
+        self.regions = regions
+        self.gap = gap
+        self.sample_rate = sample_rate
+        # Start of every region in the packed audio
+        self.packed_starts = []
+        position = 0.0
+        for start, end in regions:
+            self.packed_starts.append(position)
+            position += end - start + gap
+
+    def pack(self, audio: np.ndarray) -> np.ndarray:
+        gap = np.zeros(int(self.gap * self.sample_rate), dtype=audio.dtype)
+        pieces = []
+        for start, end in self.regions:
+            region = audio[int(start * self.sample_rate):int(end * self.sample_rate)]
+            # Pad so packed offsets stay exact even if the audio ends early
+            pieces.append(np.pad(region, (0, int(end * self.sample_rate) - int(start * self.sample_rate) - len(region))))
+            pieces.append(gap)
+        return np.concatenate(pieces) if pieces else np.zeros(0, dtype=audio.dtype)
+
+    def to_original(self, t: float) -> float:
+        if not self.regions:
+            return t
+        i = max(bisect_right(self.packed_starts, t) - 1, 0)
+        start, end = self.regions[i]
+        # Times inside a packed gap belong to the end of the region before it
+        return min(start + t - self.packed_starts[i], end)
+
+
+def snap_to_speech(segment: dict, regions: List[Tuple[float, float]]) -> dict:
+    """Tighten a segment's start/end to the speech regions it overlaps (unchanged if it overlaps none)"""
+    overlapping = [(start, end) for start, end in regions if start < segment["end"] and end > segment["start"]]
+    if not overlapping:
+        return segment
+    return {
+        **segment,
+        "start": max(segment["start"], overlapping[0][0]),
+        "end": min(segment["end"], overlapping[-1][1]),
+    }
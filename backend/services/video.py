@@ -1,11 +1,21 @@
 import os
+import tempfile
+import wave
 import ffmpeg
 from pathlib import Path
+from typing import Dict, List
+
+from .metrics import track_call
+from .workspace import WORKSPACE_ROOT
+
+# With more clips the dub is pre-mixed in chunks of this many clips: every clip is an
+# ffmpeg input whose adelay pads it with silence from 0, so one graph grows quadratically
+DUB_MIX_CHUNK_CLIPS = int(os.getenv("DUB_MIX_CHUNK_CLIPS", "32"))
 
 class VideoService:
-    def __init__(self, temp_dir: str = "./temp"):
+    def __init__(self, temp_dir: str = WORKSPACE_ROOT):
         self.temp_dir = Path(temp_dir)
-        self.temp_dir.mkdir(exist_ok=True)
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
 
     def extract_audio_from_video(self, video_path: str, output_audio_path: str) -> str:
         """
@@ -14,20 +24,22 @@ class VideoService:
         """
         try:
             # Extract audio as WAV (best for WhisperX)
-            (
-                ffmpeg
-                .input(video_path)
-                .output(output_audio_path, acodec='pcm_s16le', ac=1, ar='16k')
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True)
-            )
+            with track_call("ffmpeg", "extract_audio"):
+                (
+                    ffmpeg
+                    .input(video_path)
+                    .output(output_audio_path, acodec='pcm_s16le', ac=1, ar='16k')
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
             return output_audio_path
         except ffmpeg.Error as e:
             raise Exception(f"FFmpeg error: {e.stderr.decode()}")
 
     def get_video_duration(self, video_path: str) -> float:
         """Get video duration in seconds"""
-        probe = ffmpeg.probe(video_path)
+        with track_call("ffmpeg", "probe"):
+            probe = ffmpeg.probe(video_path)
         duration = float(probe['streams'][0]['duration'])
         return duration
 
@@ -45,19 +57,21 @@ class VideoService:
             video = ffmpeg.input(video_path)
             audio = ffmpeg.input(new_audio_path)
 
-            (
-                ffmpeg
-                .output(
-                    video.video,
-                    audio.audio,
-                    output_path,
-                    vcodec='copy',  # Copy video without re-encoding
-                    acodec='aac',  # Encode audio as AAC
-                    strict='experimental'
+            with track_call("ffmpeg", "replace_audio"):
+                (
+                    ffmpeg
+                    .output(
+                        video.video,
+                        audio.audio,
+                        output_path,
+                        vcodec='copy',  # Copy video without re-encoding
+                        acodec='aac',  # Encode audio as AAC
+                        strict='experimental',
+                        **container_options(output_path)
+                    )
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
                 )
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True)
-            )
             return output_path
         except ffmpeg.Error as e:
             raise Exception(f"FFmpeg error: {e.stderr.decode()}")
@@ -66,10 +80,182 @@ class VideoService:
         video = ffmpeg.input(video_path)
         audio = ffmpeg.input(audio_path)
 
-        ffmpeg.output(
-            video.video, audio.audio,
-            output_path,
-            vcodec="copy",  # no re-encode video
-            acodec="aac",
-            shortest=None  # don't cut anything, audio is already exact length
-        ).overwrite_output().run(quiet=True)
\ No newline at end of file
+        with track_call("ffmpeg", "replace_audio"):
+            ffmpeg.output(
+                video.video, audio.audio,
+                output_path,
+                vcodec="copy",  # no re-encode video
+                acodec="aac",
+                shortest=None,  # don't cut anything, audio is already exact length
+                **container_options(output_path)
+            ).overwrite_output().run(quiet=True)
+
+    def render_dub(self, video_path: str, clips: List[Dict], output_path: str, duration: float) -> str:
+        """
+        Mix the TTS clips and mux them with the original video in a single ffmpeg pass
+
+        Every clip is tempo-adjusted (atempo), trimmed to its segment length
+        and delayed to its start (adelay); all of them are mixed over a
+        silent bed as long as the video (amix) and the result is muxed with
+        the untouched video stream (-c:v copy). Above DUB_MIX_CHUNK_CLIPS
+        clips the track is pre-mixed chunk by chunk into a WAV first.
+
+        Args:
+            video_path: Original video
+            clips: [{"path", "start", "duration", "tempo"}, ...] from TTSService.prepare_clip
+            output_path: Output container path
+            duration: Length of the dubbed track in seconds
+        """
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as tmp_dir:
+            if len(clips) > DUB_MIX_CHUNK_CLIPS:
+                audio = ffmpeg.input(self._premix_dub(clips, duration, tmp_dir)).audio
+            else:
+                audio = self._dub_track(clips, 0.0, duration)
+            return self._mux_dub(video_path, audio, output_path)
+
+    def _premix_dub(self, clips: List[Dict], duration: float, tmp_dir: str) -> str:
+        """
+        Mix the clips into one WAV, DUB_MIX_CHUNK_CLIPS clips per ffmpeg run
+
+        Chunks start where their first clip starts, so each graph only opens
+        its own clips and pads silence over its own range; the chunk WAVs are
+        then appended to each other.
+        """
+        bounds = [0.0] + [clips[i]["start"] for i in range(DUB_MIX_CHUNK_CLIPS, len(clips), DUB_MIX_CHUNK_CLIPS)]
+        bounds = [bound for bound in bounds if bound < duration] + [duration]
+
+        chunk_paths = []
+        for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            if end <= start:
+                continue
+            chunk_path = os.path.join(tmp_dir, f"dub_{i:04d}.wav")
+            try:
+                with track_call("ffmpeg", "premix_dub"):
+                    (
+                        self._dub_track(clips, start, end - start)
+                        .output(chunk_path, acodec="pcm_s16le", ar=44100, ac=2)
+                        .overwrite_output()
+                        .run(capture_stdout=True, capture_stderr=True)
+                    )
+            except ffmpeg.Error as e:
+                raise Exception(f"FFmpeg error: {e.stderr.decode()}")
+            chunk_paths.append(chunk_path)
+
+        dub_path = os.path.join(tmp_dir, "dub.wav")
+        with wave.open(dub_path, "wb") as dub:
+            for j, chunk_path in enumerate(chunk_paths):
+                with wave.open(chunk_path, "rb") as chunk:
+                    if j == 0:
+                        dub.setparams(chunk.getparams())
+                    dub.writeframes(chunk.readframes(chunk.getnframes()))
+        return dub_path
+
+    def _mux_dub(self, video_path: str, audio, output_path: str) -> str:
+        video = ffmpeg.input(video_path)
+        try:
+            with track_call("ffmpeg", "render_dub"):
+                (
+                    ffmpeg
+                    .output(
+                        video.video,
+                        audio,
+                        output_path,
+                        vcodec="copy",  # no re-encode video
+                        acodec="aac",
+                        **container_options(output_path)
+                    )
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+            return output_path
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg error: {e.stderr.decode()}")
+
+    def render_preview_segment(self, video_path: str, clips: List[Dict], start: float, duration: float,
+                               output_path: str, height: int = 480) -> str:
+        """
+        Render one HLS preview segment (MPEG-TS) of the dubbed video
+
+        The video between `start` and `start + duration` is re-encoded (small
+        and fast, so the cut is exact and starts on a keyframe) and muxed with
+        the part of the dub that falls into it. Timestamps keep their position
+        in the full video so the segments play back to back.
+        """
+        video = ffmpeg.input(video_path, ss=f"{start:.3f}", t=f"{duration:.3f}")
+        audio = self._dub_track(clips, start, duration)
+
+        try:
+            with track_call("ffmpeg", "render_preview"):
+                (
+                    ffmpeg
+                    .output(
+                        video.video.filter("scale", -2, height),
+                        audio,
+                        output_path,
+                        vcodec="libx264",
+                        preset="veryfast",
+                        pix_fmt="yuv420p",
+                        acodec="aac",
+                        f="mpegts",
+                        output_ts_offset=f"{start:.3f}",
+                    )
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+            return output_path
+        except ffmpeg.Error as e:
+            raise Exception(f"FFmpeg error: {e.stderr.decode()}")
+
+    @staticmethod
+    def _dub_track(clips: List[Dict], start: float, duration: float):
+        """
+        Filter graph mixing the clips that fall into [start, start + duration)
+
+        Every clip is tempo-adjusted (atempo), trimmed to its segment length,
+        cut where it sticks out of the range and delayed to its offset
+        (adelay); all of them are mixed over a silent bed of `duration`.
+        """
+        bed = ffmpeg.input("anullsrc=r=44100:cl=stereo", f="lavfi", t=f"{duration:.3f}").audio
+
+        tracks = [bed]
+        for clip in clips:
+            offset = clip["start"] - start
+            if offset >= duration or offset + clip["duration"] <= 0:
+                continue
+
+            track = ffmpeg.input(clip["path"]).audio.filter("aresample", 44100)
+            for tempo in atempo_chain(clip["tempo"]):
+                track = track.filter("atempo", f"{tempo:.6f}")
+            track = track.filter("atrim", end=f"{clip['duration']:.3f}")
+            if offset < 0:
+                # Started before the range: drop the part that was already played
+                track = track.filter("atrim", start=f"{-offset:.3f}").filter("asetpts", "PTS-STARTPTS")
+                offset = 0.0
+            delay_ms = int(round(offset * 1000))
+            tracks.append(track.filter("adelay", f"{delay_ms}|{delay_ms}"))
+
+        if len(tracks) == 1:
+            return bed
+        # normalize=0 keeps each clip at full volume (they don't overlap)
+        return ffmpeg.filter(tracks, "amix", inputs=len(tracks), duration="first", normalize=0)
+
+
+def container_options(output_path: str) -> Dict[str, str]:
+    """Extra muxer options: fast-start MP4/MOV (moov atom first) so playback starts before the download ends"""
+    if Path(output_path).suffix.lower() in (".mp4", ".m4v", ".mov"):
+        return {"movflags": "+faststart"}
+    return {}
+
+
+def atempo_chain(speed: float) -> List[float]:
+    """Split a speed factor into atempo steps (atempo only allows 0.5–2.0)"""
+    steps = []
+    current = speed
+    while current > 1.95:
+        steps.append(2.0)
+        current /= 2.0
+    while current < 0.51:
+        steps.append(0.5)
+        current /= 0.5
+    steps.append(current)
+    return steps
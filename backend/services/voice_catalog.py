@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import edge_tts
+
+VOICE_CATALOG_PATH = os.getenv("VOICE_CATALOG_PATH", "./cache/voices.json")
+VOICE_CATALOG_TTL = float(os.getenv("VOICE_CATALOG_TTL", str(6 * 3600)))
+# How soon to try again after a failed refresh
+VOICE_CATALOG_RETRY = float(os.getenv("VOICE_CATALOG_RETRY", "300"))
+
+
+class VoiceCatalog:
+    """
+    In-memory, indexed copy of the edge-tts voice list
+
+    The list is fetched once and indexed by language, locale and gender.
+    It is persisted to a JSON snapshot so a restart (or an outage of the
+    voice service) doesn't need the network, and refreshed in the
+    background once it is older than `ttl`; requests never wait for a
+    refresh unless there is no copy at all. `etag` changes whenever the
+    list does.
+    """
+
+    def __init__(
+            self,
+            snapshot_path: str = VOICE_CATALOG_PATH,
+            ttl: float = VOICE_CATALOG_TTL,
+            fetch: Callable[[], Awaitable[List[Dict]]] = edge_tts.list_voices,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self.ttl = ttl
+        self.fetch = fetch
+        self.voices: List[Dict] = []
+        self.fetched_at = 0.0
+        self.etag = ""
+        self._by_language: Dict[str, List[Dict]] = {}
+        self._by_locale: Dict[str, List[Dict]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Created lazily so it binds to the loop that serves the requests
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl
+
+    async def ensure_loaded(self):
+        """Make the catalog usable: snapshot first, network only if there is no snapshot"""
+        if not self.voices:
+            async with self.lock:
+                if not self.voices:
+                    snapshot = await asyncio.to_thread(self._read_snapshot)
+                    if snapshot is not None:
+                        self._index(snapshot["voices"], snapshot["fetched_at"])
+            if not self.voices:
+                await self.refresh()
+
+        if self.is_stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_quietly())
+
+    async def refresh(self):
+        """Fetch the voice list, rebuild the index and update the snapshot"""
+        async with self.lock:
+            voices = await self.fetch()
+            if not voices:
+                raise Exception("Voice list is empty")
+            self._index(voices, time.time())
+            await asyncio.to_thread(self._write_snapshot)
+        print(f"Voice catalog refreshed: {len(voices)} voices")
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the current copy; try again after VOICE_CATALOG_RETRY
+            print(f"Voice catalog refresh failed: {e}")
+            self.fetched_at = time.time() - self.ttl + VOICE_CATALOG_RETRY
+
+    async def run_refresher(self, interval: float = None):
+        """Background loop keeping the catalog fresh"""
+        interval = interval or min(self.ttl, VOICE_CATALOG_RETRY)
+        while True:
+            try:
+                await self.ensure_loaded()
+            except Exception as e:
+                print(f"Voice catalog unavailable: {e}")
+            await asyncio.sleep(interval)
+
+    async def find(self, language: str = None, locale: str = None, gender: str = None) -> List[Dict]:
+        """Voices matching all the given filters, in the order of the upstream list"""
+        await self.ensure_loaded()
+        if locale is not None:
+            voices = self._by_locale.get(locale.lower(), [])
+        elif language is not None:
+            voices = self._by_language.get(language.lower(), [])
+        else:
+            voices = self.voices
+        if gender is not None:
+            voices = [voice for voice in voices if voice.get("Gender", "").lower() == gender.lower()]
+        return voices
+
+    def _index(self, voices: List[Dict], fetched_at: float):
+        by_language: Dict[str, List[Dict]] = {}
+        by_locale: Dict[str, List[Dict]] = {}
+        for voice in voices:
+            locale = voice.get("Locale", "")
+            by_locale.setdefault(locale.lower(), []).append(voice)
+            by_language.setdefault(locale.split("-")[0].lower(), []).append(voice)
+
+        canonical = json.dumps(voices, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        self.etag = hashlib.sha256(canonical).hexdigest()[:32]
+        self.voices = voices
+        self._by_language = by_language
+        self._by_locale = by_locale
+        self.fetched_at = fetched_at
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            return snapshot if snapshot.get("voices") else None
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_snapshot(self):
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "voices": self.voices}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+
+voice_catalog = VoiceCatalog()
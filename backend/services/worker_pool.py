@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from typing import Dict, Optional
+
+from .job_store import JobStore, JOBS_DB_PATH
+from .metrics import process_alive
+from .model_registry import model_registry
+from .pipeline import DubbingPipeline
+from .translation import TranslationService, TRANSLATION_BURST, TRANSLATION_RATE_LIMIT
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Jobs sharing one worker (and its models); their transcriptions are batched together
+JOBS_PER_WORKER = int(os.getenv("JOBS_PER_WORKER", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+
+def _worker_main(worker_id: str, db_path: str, jobs_per_worker: int, num_workers: int = 1):
+    """Entry point of a worker process"""
+    asyncio.run(_worker_loop(worker_id, JobStore(db_path), jobs_per_worker, num_workers))
+
+
+async def _worker_loop(worker_id: str, store: JobStore, jobs_per_worker: int, num_workers: int = 1):
+    await asyncio.to_thread(model_registry.warm_up)
+    # Every worker has its own token bucket, so each gets an equal share of the provider's rate limit
+    translation_service = TranslationService(
+        rate_limit=TRANSLATION_RATE_LIMIT / num_workers,
+        burst=max(1, TRANSLATION_BURST // num_workers),
+    )
+    pipeline = DubbingPipeline(translation_service=translation_service)
+    running = set()
+    print(f"Worker {worker_id} ready")
+
+    try:
+        while True:
+            if len(running) < jobs_per_worker:
+                job = await asyncio.to_thread(store.claim_next_job, worker_id)
+                if job is not None:
+                    task = asyncio.create_task(_run_job(store, pipeline, job))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    continue
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+    finally:
+        await pipeline.aclose()
+
+
+async def _run_job(store: JobStore, pipeline, job: Dict):
+    job_id = job["id"]
+    print(f"Worker picked up job {job_id}")
+    try:
+        # Multi-language jobs share extraction and transcription across their targets
+        run = pipeline.run_multi if "targets" in job["params"] else pipeline.run
+        async for event, data in run(**job["params"]):
+            await asyncio.to_thread(store.add_event, job_id, event, data)
+            if event == "complete":
+                await asyncio.to_thread(store.complete_job, job_id, data)
+            elif event == "error":
+                await asyncio.to_thread(store.fail_job, job_id, data.get("message", "Unknown error"))
+    except Exception as e:
+        await asyncio.to_thread(store.add_event, job_id, "error", {"message": str(e), "progress": 0})
+        await asyncio.to_thread(store.fail_job, job_id, str(e))
+
+
+class WorkerPool:
+    """
+    Bounded pool of worker processes executing queued dubbing jobs
+
+    Each worker claims jobs from the JobStore and runs up to
+    `jobs_per_worker` of them concurrently on its own event loop. Worker ids
+    start with the pid of the pool's process and a per-pool token, so
+    several API processes can share one JobStore without touching each
+    other's jobs.
+    """
+
+    def __init__(
+            self,
+            num_workers: int = JOB_WORKERS,
+            jobs_per_worker: int = JOBS_PER_WORKER,
+            db_path: str = JOBS_DB_PATH,
+    ):
+        self.num_workers = num_workers
+        self.jobs_per_worker = jobs_per_worker
+        self.db_path = db_path
+        self.store = JobStore(db_path)
+        # spawn instead of fork: the API process already runs an event loop and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self.pool_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def start(self):
+        # Jobs of pools whose process is gone were interrupted; other pools' jobs are left alone
+        requeued = 0
+        for worker_id in self.store.running_workers():
+            if not self._owner_alive(worker_id):
+                requeued += self.store.requeue_running_jobs(worker_id)
+        if requeued:
+            print(f"Requeued {requeued} interrupted jobs")
+        for i in range(self.num_workers):
+            self._spawn(f"{self.pool_id}-worker-{i}")
+
+    def _owner_alive(self, worker_id: str) -> bool:
+        """True if the pool that spawned `worker_id` still runs (pools share a host and the JobStore)"""
+        pid, _, rest = worker_id.partition("-")
+        if not pid.isdigit() or not rest:
+            return False
+        # Our own pid with another token: a previous run of this process (e.g. PID 1 in a container)
+        if int(pid) == os.getpid():
+            return worker_id.startswith(f"{self.pool_id}-")
+        return process_alive(int(pid))
+
+    def _spawn(self, worker_id: str):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.db_path, self.jobs_per_worker, self.num_workers),
+            name=worker_id,
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def restart_dead_workers(self) -> int:
+        """Respawn crashed workers and requeue the jobs they were running"""
+        restarted = 0
+        for worker_id, process in list(self._processes.items()):
+            if not process.is_alive():
+                print(f"Worker {worker_id} exited with code {process.exitcode}, restarting")
+                self.store.requeue_running_jobs(worker_id)
+                self._spawn(worker_id)
+                restarted += 1
+        return restarted
+
+    async def supervise(self, interval: float = 5.0):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.restart_dead_workers)
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            process.join(timeout)
+        self._processes.clear()
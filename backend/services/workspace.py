@@ -0,0 +1,86 @@
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+# Point this at a tmpfs mount (e.g. /dev/shm/video-translator) to keep intermediates in memory
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "./temp")
+WORKSPACE_TTL = float(os.getenv("WORKSPACE_TTL", "3600"))
+WORKSPACE_SWEEP_INTERVAL = float(os.getenv("WORKSPACE_SWEEP_INTERVAL", "600"))
+
+
+class Workspace:
+    """
+    Private scratch directory of a single job
+
+    Every intermediate file of a job (upload, extracted audio, TTS clips,
+    final mix) lives here so concurrent jobs never share a path.
+    """
+
+    def __init__(self, job_id: str, root: str = WORKSPACE_ROOT):
+        self.job_id = job_id
+        self.path = Path(root) / job_id
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def exists(job_id: str, root: str = WORKSPACE_ROOT) -> bool:
+        return (Path(root) / job_id).is_dir()
+
+    def file(self, name: str) -> Path:
+        return self.path / name
+
+    def subspace(self, name: str) -> "Workspace":
+        """Workspace in a subdirectory of this one (e.g. per target language of a job)"""
+        return Workspace(name, str(self.path))
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+
+def sweep_workspaces(
+        root: str = WORKSPACE_ROOT,
+        max_age: float = WORKSPACE_TTL,
+        is_active: Optional[Callable[[str], bool]] = None,
+) -> int:
+    """Remove workspaces not touched for `max_age` seconds, skipping jobs that are still active"""
+    root_path = Path(root)
+    if not root_path.exists():
+        return 0
+
+    removed = 0
+    cutoff = time.time() - max_age
+    for path in root_path.iterdir():
+        if not path.is_dir():
+            continue
+        try:
+            if path.stat().st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        if is_active is not None and is_active(path.name):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+
+    if removed:
+        print(f"Removed {removed} stale directories from {root_path}")
+    return removed
+
+
+async def run_workspace_sweeper(
+        interval: float = WORKSPACE_SWEEP_INTERVAL,
+        is_active: Optional[Callable[[str], bool]] = None,
+        root: str = WORKSPACE_ROOT,
+        max_age: float = WORKSPACE_TTL,
+):
+    while True:
+        await asyncio.to_thread(sweep_workspaces, root=root, max_age=max_age, is_active=is_active)
+        await asyncio.sleep(interval)
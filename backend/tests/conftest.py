@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Tests import the services package the way main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Keep the multiprocess metric files of test runs out of ./metrics
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="metrics-"))
@@ -0,0 +1,55 @@
+import pytest
+
+from services.job_store import QUEUED, RETRY_EVENT, RUNNING, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def failed_job(store):
+    job_id = store.create_job({"filename": "a.mp4"})
+    store.claim_next_job("worker")
+    store.add_event(job_id, "progress", {"progress": 10})
+    store.add_event(job_id, "error", {"message": "boom"})
+    store.fail_job(job_id, "boom")
+    return job_id
+
+
+def test_retry_requeues_a_failed_job_with_a_marker(store):
+    job_id = failed_job(store)
+
+    seq = store.retry_job(job_id)
+
+    job = store.get_job(job_id)
+    assert job["status"] == QUEUED
+    assert job["error"] is None
+    assert seq == 3
+    assert store.get_events(job_id, seq - 1)[0]["event"] == RETRY_EVENT
+
+
+def test_only_failed_jobs_can_be_retried(store):
+    job_id = store.create_job({"filename": "a.mp4"})
+
+    assert store.retry_job(job_id) is None
+    store.claim_next_job("worker")
+    assert store.get_job(job_id)["status"] == RUNNING
+    assert store.retry_job(job_id) is None
+    assert store.retry_job("missing") is None
+
+
+def test_current_run_start_skips_the_failed_runs(store):
+    job_id = failed_job(store)
+    assert store.current_run_start(job_id) == 0
+
+    store.retry_job(job_id)
+    store.claim_next_job("worker")
+    store.add_event(job_id, "progress", {"progress": 20})
+    store.fail_job(job_id, "again")
+    second = store.retry_job(job_id)
+
+    start = store.current_run_start(job_id)
+    assert start == second - 1
+    assert [event["event"] for event in store.get_events(job_id, start)] == [RETRY_EVENT]
+    assert store.get_job(job_id)["status"] == QUEUED
@@ -0,0 +1,47 @@
+from services.resegment import resegment
+
+
+def segment(start, end, text, words=None):
+    return {"start": start, "end": end, "text": text, "words": words or []}
+
+
+def test_unfinished_sentences_are_merged():
+    units = resegment([
+        segment(0.0, 2.0, " Hello there"),
+        segment(2.3, 4.0, "my friend."),
+    ], max_gap=0.8)
+
+    assert len(units) == 1
+    assert units[0]["text"] == "Hello there my friend."
+    assert (units[0]["start"], units[0]["end"]) == (0.0, 4.0)
+
+
+def test_sentence_ends_long_pauses_and_max_duration_split():
+    finished = resegment([segment(0.0, 2.0, "Done."), segment(2.1, 4.0, "Next")], min_duration=1.5)
+    paused = resegment([segment(0.0, 2.0, "Wait"), segment(3.5, 5.0, "for it")], max_gap=0.8)
+    too_long = resegment([segment(0.0, 6.0, "A long"), segment(6.1, 12.0, "run on")], max_duration=10)
+
+    assert len(finished) == 2
+    assert len(paused) == 2
+    assert len(too_long) == 2
+
+
+def test_short_sentences_are_merged_anyway():
+    units = resegment([segment(0.0, 0.8, "Yes."), segment(1.0, 3.0, "Let's go.")], min_duration=1.5)
+
+    assert len(units) == 1
+    assert units[0]["text"] == "Yes. Let's go."
+
+
+def test_bounds_follow_word_timestamps_and_words_are_kept():
+    words_a = [{"word": "Hi", "start": 0.4, "end": 0.7}, {"word": "you", "start": 0.8, "end": 1.6}]
+    words_b = [{"word": "there", "start": 2.1, "end": 2.6}, {"word": "."}]
+
+    units = resegment([segment(0.0, 2.0, "Hi you", words_a), segment(1.9, 3.0, "there.", words_b)])
+
+    assert (units[0]["start"], units[0]["end"]) == (0.4, 2.6)
+    assert units[0]["words"] == words_a + words_b
+
+
+def test_empty_input():
+    assert resegment([]) == []
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from services.stage_graph import StageGraph
+
+
+async def items(values):
+    for value in values:
+        yield value
+
+
+async def collect(graph, source):
+    return [result async for result in graph.run(source)]
+
+
+def test_results_come_in_source_order():
+    async def slow_first(x):
+        # Earlier items finish later, so results arrive out of order
+        await asyncio.sleep(0.01 * (5 - x))
+        return x * 10
+
+    async def plus_one(x):
+        return x + 1
+
+    graph = StageGraph().add_stage("slow", slow_first, workers=5).add_stage("add", plus_one, workers=2)
+
+    assert asyncio.run(collect(graph, items(range(5)))) == [1, 11, 21, 31, 41]
+
+
+def test_stages_overlap():
+    events = []
+
+    async def first(x):
+        events.append(("first", x))
+        await asyncio.sleep(0.01)
+        return x
+
+    async def second(x):
+        await asyncio.sleep(0.05)
+        events.append(("second done", x))
+        return x
+
+    graph = StageGraph().add_stage("first", first).add_stage("second", second)
+    asyncio.run(collect(graph, items(range(3))))
+
+    # The first stage has moved on to later items while the second one is still busy with item 0
+    assert events.index(("first", 2)) < events.index(("second done", 0))
+
+
+def test_stage_failure_is_raised():
+    async def fail_on_two(x):
+        if x == 2:
+            raise ValueError("bad item")
+        return x
+
+    graph = StageGraph().add_stage("check", fail_on_two, workers=2)
+
+    with pytest.raises(ValueError, match="bad item"):
+        asyncio.run(collect(graph, items(range(5))))
+
+
+def test_source_failure_is_raised():
+    async def broken_source():
+        yield 1
+        raise RuntimeError("source broke")
+
+    async def identity(x):
+        return x
+
+    graph = StageGraph().add_stage("identity", identity)
+
+    with pytest.raises(RuntimeError, match="source broke"):
+        asyncio.run(collect(graph, broken_source()))
+
+
+def test_graph_without_stages_is_refused():
+    with pytest.raises(Exception, match="no stages"):
+        asyncio.run(collect(StageGraph(), items([1])))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from services.time_stretch import time_stretch
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float, frequency: float = 220.0, channels: int = 2) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+    return np.repeat(samples[:, None], channels, axis=1)
+
+
+def dominant_frequency(samples: np.ndarray) -> float:
+    mono = samples[:, 0].astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(mono * np.hanning(len(mono))))
+    return float(np.fft.rfftfreq(len(mono), 1 / SAMPLE_RATE)[np.argmax(spectrum)])
+
+
+@pytest.mark.parametrize("target_seconds", [0.5, 1.0, 1.5])
+def test_output_has_exact_length_shape_and_dtype(target_seconds):
+    samples = tone(1.0)
+    target = int(target_seconds * SAMPLE_RATE)
+
+    stretched = time_stretch(samples, SAMPLE_RATE, target)
+
+    assert stretched.shape == (target, 2)
+    assert stretched.dtype == np.int16
+
+
+@pytest.mark.parametrize("target_seconds", [0.6, 1.6])
+def test_pitch_is_kept(target_seconds):
+    stretched = time_stretch(tone(1.0, frequency=440.0), SAMPLE_RATE, int(target_seconds * SAMPLE_RATE))
+
+    assert dominant_frequency(stretched) == pytest.approx(440.0, abs=10)
+
+
+def test_mono_input_gets_a_channel_axis():
+    stretched = time_stretch(tone(1.0)[:, 0], SAMPLE_RATE, 8000)
+
+    assert stretched.shape == (8000, 1)
+
+
+def test_clip_shorter_than_a_window_is_resampled():
+    stretched = time_stretch(tone(0.001), SAMPLE_RATE, 100)
+
+    assert stretched.shape == (100, 2)
+
+
+def test_empty_input_and_zero_target():
+    empty = np.zeros((0, 2), dtype=np.int16)
+
+    assert time_stretch(empty, SAMPLE_RATE, 50).shape == (50, 2)
+    assert not time_stretch(empty, SAMPLE_RATE, 50).any()
+    assert time_stretch(tone(1.0), SAMPLE_RATE, 0).shape == (0, 2)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from services.translation import TokenBucket, TranslationService
+from services.translation_backends import FakeBackend
+from services.translation_cache import TranslationCache
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    async def acquire_all(bucket, count):
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire_all(TokenBucket(rate=10, capacity=5), 5)) < 0.05
+    # 5 from the burst, the other 3 at 10 per second
+    assert asyncio.run(acquire_all(TokenBucket(rate=10, capacity=5), 8)) == pytest.approx(0.3, abs=0.1)
+
+
+def test_token_bucket_without_a_rate_never_waits():
+    async def acquire_many():
+        bucket = TokenBucket(rate=0, capacity=0)
+        for _ in range(100):
+            await bucket.acquire()
+
+    asyncio.run(acquire_many())
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = TranslationService(backend="fake", backend_overrides={}, cache=TranslationCache(str(tmp_path / "translations.db")))
+    yield service
+    asyncio.run(service.aclose())
+
+
+def translate(service, texts, target="de"):
+    async def run():
+        return [item async for item in service.translate_many(texts, source_lang="en", target_lang=target)]
+    return asyncio.run(run())
+
+
+def test_translate_many_yields_in_order(service):
+    texts = [f"sentence {i}" for i in range(250)]
+
+    results = translate(service, texts)
+
+    assert [idx for idx, _ in results] == list(range(250))
+    assert [translation for _, translation in results] == [f"[de] {text}" for text in texts]
+    # FakeBackend takes 100 texts per request
+    assert service.get_backend("en", "de").requests == 3
+
+
+def test_translate_many_serves_repeats_from_the_cache(service):
+    translate(service, ["hello", "world"])
+    backend = service.get_backend("en", "de")
+    requests = backend.requests
+
+    results = translate(service, ["world", "hello", "new"])
+
+    assert [translation for _, translation in results] == ["[de] world", "[de] hello", "[de] new"]
+    # Only the miss was sent
+    assert backend.requests == requests + 1
+
+
+def test_translate_text(service):
+    assert asyncio.run(service.translate_text("hi", "en", "fr")) == "[fr] hi"
+    assert isinstance(service.get_backend("en", "fr"), FakeBackend)
@@ -0,0 +1,110 @@
+import wave
+
+import numpy as np
+import pytest
+
+from services.vad import (
+    VAD_FRAME_SECONDS,
+    VAD_SAMPLE_RATE,
+    SpeechMap,
+    detect_speech,
+    file_speech_regions,
+    snap_to_speech,
+)
+
+QUIET_DB = -60.0
+LOUD_DB = -20.0
+
+
+def energy(*parts):
+    """Per-frame energy from (seconds, dBFS) parts"""
+    return np.concatenate([np.full(int(round(seconds / VAD_FRAME_SECONDS)), level) for seconds, level in parts])
+
+
+def write_wav(path, samples: np.ndarray):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(VAD_SAMPLE_RATE)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def test_detects_loud_stretches_with_padding():
+    regions = detect_speech(energy((3, QUIET_DB), (2, LOUD_DB), (3, QUIET_DB)), padding=0.2)
+
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert start == pytest.approx(2.8, abs=VAD_FRAME_SECONDS)
+    assert end == pytest.approx(5.2, abs=VAD_FRAME_SECONDS)
+
+
+def test_short_pauses_are_bridged_and_long_ones_split():
+    bridged = detect_speech(
+        energy((3, QUIET_DB), (1, LOUD_DB), (0.3, QUIET_DB), (1, LOUD_DB), (3, QUIET_DB)),
+        min_silence=0.5, padding=0,
+    )
+    split = detect_speech(
+        energy((3, QUIET_DB), (1, LOUD_DB), (2, QUIET_DB), (1, LOUD_DB), (3, QUIET_DB)),
+        min_silence=0.5, padding=0,
+    )
+
+    assert len(bridged) == 1
+    assert len(split) == 2
+
+
+def test_short_bursts_are_dropped():
+    regions = detect_speech(energy((3, QUIET_DB), (0.06, LOUD_DB), (3, QUIET_DB)), min_speech=0.15)
+
+    assert regions == []
+
+
+def test_silence_has_no_speech():
+    assert detect_speech(energy((5, QUIET_DB))) == []
+    assert detect_speech(np.zeros(0)) == []
+
+
+def test_file_regions_of_speech_between_silence(tmp_path):
+    rate = VAD_SAMPLE_RATE
+    t = np.arange(4 * rate) / rate
+    samples = np.concatenate([np.zeros(4 * rate), 0.3 * np.sin(2 * np.pi * 200 * t), np.zeros(4 * rate)])
+    samples += 0.0005 * np.random.default_rng(0).standard_normal(len(samples))
+    write_wav(tmp_path / "speech.wav", samples)
+
+    regions = file_speech_regions(str(tmp_path / "speech.wav"))
+
+    assert len(regions) == 1
+    assert regions[0][0] == pytest.approx(4.0, abs=0.3)
+    assert regions[0][1] == pytest.approx(8.0, abs=0.3)
+
+
+def test_file_without_a_quiet_floor_falls_back_to_none(tmp_path):
+    # A constant level (e.g. speech over music) leaves almost nothing above the floor
+    rate = VAD_SAMPLE_RATE
+    t = np.arange(20 * rate) / rate
+    write_wav(tmp_path / "music.wav", 0.3 * np.sin(2 * np.pi * 200 * t))
+
+    assert file_speech_regions(str(tmp_path / "music.wav")) is None
+
+
+def test_speech_map_packs_regions_and_maps_times_back():
+    speech_map = SpeechMap([(1.0, 2.0), (5.0, 6.5)], gap=0.5, sample_rate=10)
+    audio = np.arange(100, dtype=np.float32)
+
+    packed = speech_map.pack(audio)
+
+    # 1 s + gap + 1.5 s + gap at 10 samples per second
+    assert len(packed) == 35
+    assert list(packed[:10]) == list(range(10, 20))
+    assert list(packed[15:30]) == list(range(50, 65))
+    assert speech_map.to_original(0.5) == pytest.approx(1.5)
+    assert speech_map.to_original(1.6) == pytest.approx(5.1)
+    # Inside a packed gap: the end of the region before it
+    assert speech_map.to_original(1.2) == pytest.approx(2.0)
+
+
+def test_snap_to_speech_tightens_to_overlapping_regions():
+    regions = [(1.0, 2.0), (3.0, 4.0)]
+
+    assert snap_to_speech({"start": 0.5, "end": 3.5}, regions) == {"start": 1.0, "end": 3.5}
+    assert snap_to_speech({"start": 1.5, "end": 4.5}, regions) == {"start": 1.5, "end": 4.0}
+    assert snap_to_speech({"start": 2.2, "end": 2.8}, regions) == {"start": 2.2, "end": 2.8}